@@ -1,8 +1,13 @@
 from __future__ import annotations
 import json
 import re
+import hashlib
 import time
+import heapq
+import functools
 import os
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable, Dict, List, Tuple, Optional
@@ -77,6 +82,7 @@ MAPPER_PROMPT = (
     " - Normalize slashes to '/'; strip leading './' when possible; return paths relative to 'root'.\n"
     " - Consider only plausible script files (.sh,.bash,.ksh,.bat,.cmd,.ps1,.pl,.py).\n"
     " - IF 'allowed_paths' is provided, choose only from that list; otherwise be conservative.\n"
+    " - IF 'allowed_paths_total' is present, 'allowed_paths' is a local subset of that many project scripts.\n"
     " - IF 'observations' are present, use them to refine your choice, but still obey 'allowed_paths'.\n"
     "OUTPUT (STRICT JSON): {\"targets\":[\"relative/path\", ...], \"reasoning\":\"<brief why>\"}\n"
     "FAIL SAFE: If uncertain, return an empty 'targets' list (do not guess).\n"
@@ -103,11 +109,71 @@ def _clean_val(v: str) -> Optional[str]:
     v = (v or "").strip().strip('"').strip("'")
     return v if SAFE_VAL.match(v) else None
 
+_ALLOWED_EXTS = (".sh",".bash",".ksh",".bat",".cmd",".ps1",".pl",".py")
+# Command prefixes that mark a static edge's command as a real invocation
+_ALLOWED_PREFIXES = (
+    ". ", "source ", "& ", "call ", "start ",
+    "bash ", "sh ", "ksh ", "python ", "python3 ", "perl "
+)
+# Accept direct script invocations like: ./x.sh, x.sh, utils/x.sh, "utils/x.sh"
+_DIRECT_CALL_RE = re.compile(
+    r"""^["']?                  # optional opening quote
+        (?:\./|../|/)?          # optional ./, ../ or /
+        [\w./-]+
+        \.(?:sh|bash|ksh|bat|cmd|ps1|pl|py)  # known script ext
+        (?:\s|["']?$)           # end or whitespace or closing quote
+    """, re.VERBOSE | re.IGNORECASE
+)
+
+_DOUBLE_SLASH = re.compile(r"/{2,}")
+
+@functools.lru_cache(maxsize=65536)
 def _norm_path(p: str) -> str:
+    # Paths repeat heavily across index build, carry-over and resolution; cache them.
     p = (p or "").strip().strip('"').strip("'").replace("\\", "/")
     if p.startswith("./"): p = p[2:]
-    while "//" in p: p = p.replace("//", "/")
-    return p
+    if "//" in p: p = _DOUBLE_SLASH.sub("/", p)
+    # interned: index membership and edge-key compares can short-circuit on identity
+    return sys.intern(p)
+
+def _dumps_with_allowed(payload: dict, allowed_json: str, extra: Optional[dict] = None) -> str:
+    """json.dumps(payload + allowed_paths + extra) with the allowed list spliced in pre-serialized."""
+    s = json.dumps(payload, ensure_ascii=False)[:-1] + ', "allowed_paths": ' + allowed_json
+    if extra:
+        s += ", " + json.dumps(extra, ensure_ascii=False)[1:-1]
+    return s + "}"
+
+def _src_dir(src: str) -> str:
+    """Directory part of a root-relative posix path ('' for root-level files)."""
+    return src.rsplit("/", 1)[0] if "/" in src else ""
+
+def _caller_rel(src_dir: str, t: str) -> str:
+    """'t' resolved relative to the caller's directory (string join; absolute 't' wins)."""
+    return _norm_path(f"{src_dir}/{t}" if src_dir and not t.startswith("/") else t)
+
+def _resolve_static(src: str, raw: str, t_sub: str, allowed_set: frozenset[str],
+                    allowed_lower: frozenset[str], windowsish: bool) -> Optional[str]:
+    """First indexed target for a non-dynamic call-site: the substituted form (if it differs)
+    before the raw one, each tried as-is and then relative to the caller."""
+    t_raw = _norm_path(raw)
+    src_dir = _src_dir(src)
+    for t in ((t_sub, t_raw) if t_sub and t_sub != t_raw else (t_raw,)):
+        if (t in allowed_set) or (windowsish and t.lower() in allowed_lower):
+            return t
+        rel = _caller_rel(src_dir, t)
+        if (rel in allowed_set) or (windowsish and rel.lower() in allowed_lower):
+            return rel
+    return None
+
+def _walk_scripts(root: Path) -> list[str]:
+    """Root-relative posix paths of all script files under 'root', in a single tree walk."""
+    out: list[str] = []
+    base = str(root)
+    for dirpath, _dirs, files in os.walk(base):
+        rel_dir = os.path.relpath(dirpath, base).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else rel_dir + "/"
+        out.extend(prefix + f for f in files if f.endswith(_ALLOWED_EXTS))
+    return out
 
 def _write_run_stats(out_dir: Path, roles: str, lat_ms: dict[str, float], g: Graph, unresolved: list[dict], coverage: dict = None) -> None:
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -193,15 +259,7 @@ class Planner:
         return "other"
 
     def _light_crawl(self, root: Path) -> list[str]:
-        paths = []
-        for ext in (".sh",".bash",".ksh",".bat",".cmd",".ps1",".pl",".py"):
-            for p in root.rglob(f"*{ext}"):
-                try:
-                    rel = p.relative_to(root).as_posix()
-                    paths.append(rel)
-                except Exception:
-                    pass
-        return sorted(set(paths))
+        return sorted(set(_walk_scripts(root)))
 
     def _load_seeds(self, root: Path) -> set[str]:
         seeds: set[str] = set()
@@ -356,7 +414,7 @@ class Reader:
         t = (tok or "").strip().strip('"').strip("'")
         if not t:
             return False
-        if ("/" in t or "\\" in t or t.lower().endswith((".sh",".bash",".ksh",".bat",".cmd",".ps1",".pl",".py"))):
+        if ("/" in t or "\\" in t or t.lower().endswith(_ALLOWED_EXTS)):
             return True
         return bool(re.match(
             r"^(\$[A-Za-z_][A-Za-z0-9_]*|\$\{[A-Za-z_][A-Za-z0-9_]*\}|%[A-Za-z_][A-Za-z0-9_]*%|![A-Za-z_][A-Za-z0-9_]*!)$",
@@ -615,6 +673,15 @@ class Mapper:
         self.client = client; self.logger = logger; self.use_heuristic_fallback = use_heuristic_fallback
         self.log_prompts = bool(log_prompts)
         self._redactor = redactor or Redactor()
+        # src -> first 1000 chars; shared across call-sites and loops (LRU-bounded)
+        self._snippet_cache: OrderedDict[str, str] = OrderedDict()
+        # per-root file index and per-graph baseline index, reused when run() is re-entered (loop2)
+        self._indices_cache: dict[Path, tuple[frozenset[str], frozenset[str], list[str], bool]] = {}
+        self._baseline_cache: tuple[Graph, bool, dict[str, list[str]]] | None = None
+        # (root, src dir) -> (serialized allowed_paths, scope extra or None)
+        self._allowed_json_cache: dict[tuple[Path, str], tuple[str, Optional[dict]]] = {}
+        # root -> {dir: scripts directly in it}, for the partial allowed lists of large bundles
+        self._dir_files_cache: dict[Path, dict[str, list[str]]] = {}
 
     def _env_for_src(self, obs: ObservationBatch, src: str) -> dict[str,str]:
         env: dict[str, str] = {}
@@ -625,15 +692,25 @@ class Mapper:
 
     def _subst(self, s: str, env: dict[str,str]) -> str:
         out = (s or "").strip().strip('"').strip("'")
+        if not env or not ("%" in out or "!" in out or "$" in out):
+            return _norm_path(out)
         for _ in range(5):
             prev = out
+            out_l = out.lower()
             for k, v in env.items():
+                # cheap membership pre-filter: skip keys not referenced by the current string
+                kl = k.lower()
+                win = f"%{kl}%" in out_l or f"!{kl}!" in out_l
+                if not win and f"${k}" not in out and f"${{{k}}}" not in out:
+                    continue
                 vv = (v or "").strip().strip('"').strip("'")
-                # Windows CMD
-                out = re.sub(rf"%{re.escape(k)}%", vv, out, flags=re.I)
-                out = re.sub(rf"!{re.escape(k)}!", vv, out, flags=re.I)
+                if win:
+                    # Windows CMD
+                    out = re.sub(rf"%{re.escape(k)}%", vv, out, flags=re.I)
+                    out = re.sub(rf"!{re.escape(k)}!", vv, out, flags=re.I)
                 # POSIX / PS
                 out = out.replace(f"${{{k}}}", vv).replace(f"${k}", vv)
+                out_l = out.lower()
             if out == prev:
                 break
         return _norm_path(out)
@@ -667,23 +744,37 @@ class Mapper:
 
     def _list_candidates(self, allowed_set: set[str], base_dirs: list[str]) -> dict[str, list[str]]:
         """Return directory -> up to 50 candidate script files under that directory from allowed_set."""
-        ALLOWED_EXTS = (".sh",".bash",".ksh",".bat",".cmd",".ps1",".pl",".py")
         out: dict[str, list[str]] = {}
         for d in base_dirs:
             prefix = d.rstrip("/") + "/"
-            files = [p for p in allowed_set if p.startswith(prefix)]
-            files = [p for p in files if p.lower().endswith(ALLOWED_EXTS)]
+            files = [p for p in allowed_set if p.startswith(prefix) and p.lower().endswith(_ALLOWED_EXTS)]
             if files:
-                out[d] = sorted(files)[:50]
+                out[d] = heapq.nsmallest(50, files)
         return out
 
-    def _make_observations(self, io: RoleIO, src: str, raw: str, env: dict[str,str], allowed_set: set[str]) -> dict:
-        """Build a small observation payload for a second mapper pass."""
+    _SNIPPET_CACHE_MAX = 2048
+
+    def _read_snippet(self, io: RoleIO, src: str) -> str:
+        """First 1000 chars of 'src', read once per Mapper and cached."""
+        cache = self._snippet_cache
+        snippet = cache.get(src)
+        if snippet is not None:
+            cache.move_to_end(src)
+            return snippet
         snippet = ""
         try:
-            snippet = (io.root / src).read_text(encoding="utf-8", errors="ignore")[:1000]
+            with open(io.root / src, "r", encoding="utf-8", errors="ignore") as f:
+                snippet = f.read(1000)
         except Exception:
             pass
+        cache[src] = snippet
+        if len(cache) > self._SNIPPET_CACHE_MAX:
+            cache.popitem(last=False)
+        return snippet
+
+    def _make_observations(self, io: RoleIO, src: str, raw: str, env: dict[str,str], allowed_set: set[str]) -> dict:
+        """Build a small observation payload for a second mapper pass."""
+        snippet = self._read_snippet(io, src)
         dirs = self._extract_dirs(src, raw, env, allowed_set)
         return {"src_snippet": snippet, "dir_listings": self._list_candidates(allowed_set, dirs)}
 
@@ -710,37 +801,84 @@ class Mapper:
                 env[dest] = _norm_path(f"{a1.rstrip('/')}/{b1.lstrip('/')}")
         return env
 
-    def run(self, io: RoleIO, obs: ObservationBatch, policy: dict) -> GraphSnapshot:
-        g = Graph()
-        unresolved: list[dict] = []
-
-        # --- Build allowed file index and platform case policy early ---
-        ALLOWED_EXTS = (".sh",".bash",".ksh",".bat",".cmd",".ps1",".pl",".py")
-        allowed_set: set[str] = set()
-        for ext in ALLOWED_EXTS:
-            for p in io.root.rglob(f"*{ext}"):
-                try:
-                    rel = p.relative_to(io.root).as_posix()
-                    allowed_set.add(_norm_path(rel))
-                except Exception:
-                    pass
+    def _file_index(self, root: Path) -> tuple[frozenset[str], frozenset[str], list[str], bool]:
+        """Allowed script index + Windows flag for 'root'. The file set does not change
+        between mapper loops (only peeks are promoted), so it is built once per root."""
+        hit = self._indices_cache.get(root)
+        if hit is not None:
+            return hit
+        allowed_set = frozenset(_norm_path(rel) for rel in _walk_scripts(root))
         windowsish = False
         try:
-            meta = json.loads((io.root / "meta.json").read_text(encoding="utf-8"))
+            meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
             windowsish = str(meta.get("platform","")).lower() == "windows"
         except Exception:
             pass
-        def _canon_case(p: str) -> str:
-            return p.lower() if windowsish else p
-        allowed_lower = {p.lower() for p in allowed_set}
-        allowed_list = sorted(allowed_set)
-        has_static_baseline = any(not e.dynamic for e in getattr(io, "graph", Graph()).edges)
-
+        allowed_lower = frozenset(sys.intern(p.lower()) for p in allowed_set)
+        hit = (allowed_set, allowed_lower, sorted(allowed_set), windowsish)
+        self._indices_cache[root] = hit
+        return hit
+
+    # Bundles up to this many scripts send the full allowed list; larger ones send a local subset.
+    _PROMPT_ALLOWED_MAX = 200
+
+    def _allowed_for_prompt(self, root: Path, allowed_list: list[str], src: str) -> tuple[str, Optional[dict]]:
+        """Serialized 'allowed_paths' for a call-site in 'src' plus an optional scope note.
+        Large bundles get the scripts next to 'src' and the first root-level scripts; the
+        note carries the full list size and digest so the model knows the list is partial."""
+        d = src.rsplit("/", 1)[0] if "/" in src else "."
+        if len(allowed_list) <= self._PROMPT_ALLOWED_MAX:
+            d = ""
+        key = (root, d)
+        hit = self._allowed_json_cache.get(key)
+        if hit is not None:
+            return hit
+        if not d:
+            hit = (json.dumps(allowed_list, ensure_ascii=False), None)
+        else:
+            full = self._allowed_json_cache.get((root, ""))
+            if full is None:
+                full = (json.dumps(allowed_list, ensure_ascii=False), None)
+                self._allowed_json_cache[(root, "")] = full
+            dir_to_files = self._dir_files_cache.get(root)
+            if dir_to_files is None:
+                dir_to_files = {}
+                for p in allowed_list:
+                    dir_to_files.setdefault(p.rsplit("/", 1)[0] if "/" in p else ".", []).append(p)
+                self._dir_files_cache[root] = dir_to_files
+            # scripts next to 'src' first, then root-level ones; capped as a whole
+            own = dir_to_files.get(d, [])
+            near = own + [p for p in dir_to_files.get(".", []) if d != "."]
+            local = sorted(near[:self._PROMPT_ALLOWED_MAX])
+            scope = {"allowed_paths_total": len(allowed_list),
+                     "allowed_paths_digest": hashlib.sha1(full[0].encode("utf-8")).hexdigest()[:12]}
+            hit = (json.dumps(local, ensure_ascii=False), scope)
+        self._allowed_json_cache[key] = hit
+        return hit
+
+    def _baseline_index(self, graph: Graph) -> tuple[bool, dict[str, list[str]]]:
+        """Static-baseline flag and statically-known source imports, cached per base graph."""
+        hit = self._baseline_cache
+        if hit is not None and hit[0] is graph:
+            return hit[1], hit[2]
+        has_static_baseline = any(not e.dynamic for e in graph.edges)
         # Collect statically-known source imports (if baseline is present)
         static_sources: dict[str, list[str]] = {}
-        for e in getattr(io, "graph", Graph()).edges:
+        for e in graph.edges:
             if (not e.dynamic) and e.kind == "source":
                 static_sources.setdefault(e.src, []).append(e.dst)
+        self._baseline_cache = (graph, has_static_baseline, static_sources)
+        return has_static_baseline, static_sources
+
+    def run(self, io: RoleIO, obs: ObservationBatch, policy: dict) -> GraphSnapshot:
+        g = Graph()
+        unresolved: list[dict] = []
+
+        # --- Allowed file index and platform case policy (reused across loops) ---
+        allowed_set, allowed_lower, allowed_list, windowsish = self._file_index(io.root)
+        def _canon_case(p: str) -> str:
+            return sys.intern(p.lower()) if windowsish else p
+        has_static_baseline, static_sources = self._baseline_index(getattr(io, "graph", Graph()))
 
         # Quick index of observed dot-source call sites per src
         source_calls_by_src: dict[str, list[dict]] = {}
@@ -756,12 +894,13 @@ class Mapper:
             # Try local substitution using vars defined in the same script
             local_env = {v["name"]: v["value"] for v in obs.env_vars if v["scope"] == src}
             cand1 = self._subst(raw, local_env)
+            src_dir = _src_dir(src)
             for tok in [cand1, _norm_path(raw)]:
                 if not tok:
                     continue
                 if (tok in allowed_set) or (windowsish and tok.lower() in allowed_lower):
                     return tok
-                rel = _norm_path(os.path.join(os.path.dirname(src), tok))
+                rel = _caller_rel(src_dir, tok)
                 if (rel in allowed_set) or (windowsish and rel.lower() in allowed_lower):
                     return rel
             return None
@@ -811,32 +950,23 @@ class Mapper:
                 env = self._ps_eval_joins(io, src, env)
             return env
 
-        ALLOWED_PREFIXES = (
-            ". ", "source ", "& ", "call ", "start ",
-            "bash ", "sh ", "ksh ", "python ", "python3 ", "perl "
-        )
-        # Accept direct script invocations like: ./x.sh, x.sh, utils/x.sh, "utils/x.sh"
-        DIRECT_CALL_RE = re.compile(
-            r"""^["']?                  # optional opening quote
-                (?:\./|../|/)?          # optional ./, ../ or /
-                [\w./-]+
-                \.(?:sh|bash|ksh|bat|cmd|ps1|pl|py)  # known script ext
-                (?:\s|["']?$)           # end or whitespace or closing quote
-            """, re.VERBOSE | re.IGNORECASE
-        )
         # carry over static edges, canonicalized, with sanity filters
+        # (dst is lowercased on Windows, so the lowercase index is the one to check there)
+        _canon = _canon_case; add_edge = g.add_edge
+        _allowed = allowed_lower if windowsish else allowed_set
+        _prefixes = _ALLOWED_PREFIXES; _direct_match = _DIRECT_CALL_RE.match
         for e in getattr(io, "graph", Graph()).edges:
             if not e.dynamic:
-                cmd = (getattr(e, "command", "") or "").strip().lower()
-                dst_c = _canon_case(e.dst)
+                dst_c = _canon(e.dst)
                 # Keep only if destination exists in our index (case-aware)
-                if not ((dst_c in allowed_set) or (windowsish and dst_c in {p.lower() for p in allowed_set})):
+                if dst_c not in _allowed:
                     continue
                 # If we have a command string, require it to look like a real invocation
-                if cmd and not (any(cmd.startswith(pfx) for pfx in ALLOWED_PREFIXES) or DIRECT_CALL_RE.match(cmd)):
+                cmd = (e.command or "").strip().lower()
+                if cmd and not (cmd.startswith(_prefixes) or _direct_match(cmd)):
                     continue
-                g.add_edge(Edge(
-                    src=_canon_case(e.src), dst=dst_c,
+                add_edge(Edge(
+                    src=_canon(e.src), dst=dst_c,
                     kind=e.kind, command=e.command,
                     dynamic=e.dynamic, resolved=e.resolved,
                     confidence=e.confidence, reason=e.reason
@@ -851,47 +981,34 @@ class Mapper:
         for idx, cs in enumerate(obs.call_sites, 1):
             src = cs["src"]; raw = cs["raw"]; kind = cs["kind"]
             cmd = cs.get("cmd") or f"{kind} {raw}"
-            env = env_for(src)
 
             # --- Non-dynamic call-sites: if no static baseline, resolve and keep them ---
             if not cs.get("dynamic", 0):
-                if not has_static_baseline:
-                    direct_candidates: list[str] = []
-                    # Prefer local substitution first (covers things like ". ${UTILS}/lib.sh")
-                    t_sub = self._subst(raw, env)
-                    if t_sub and t_sub != _norm_path(raw):
-                        direct_candidates.append(t_sub)
-                    direct_candidates.append(_norm_path(raw))
-                    added = False
-                    for t in direct_candidates:
-                        # as-is
-                        if (t in allowed_set) or (windowsish and t.lower() in allowed_lower):
-                            g.add_edge(Edge(src=_canon_case(src), dst=_canon_case(t), kind=kind,
-                                            command=cmd, dynamic=False, resolved=True, confidence=0.9,
-                                            reason="static-direct in 2R/4R"))
-                            added = True
-                            break
-                        # relative to caller
-                        rel = _norm_path(os.path.join(os.path.dirname(src), t))
-                        if (rel in allowed_set) or (windowsish and rel.lower() in allowed_lower):
-                            g.add_edge(Edge(src=_canon_case(src), dst=_canon_case(rel), kind=kind,
-                                            command=cmd, dynamic=False, resolved=True, confidence=0.9,
-                                            reason="static-direct in 2R/4R"))
-                            added = True
-                            break
-                    if not added:
-                        g.add_node(src)
-                        unresolved.append({"src": _canon_case(src), "raw_target": raw, "reason": "non-dynamic-unresolved"})
-                else:
+                if has_static_baseline:
                     # baseline present: these edges were already carried over, avoid duplicates
                     g.add_node(src)
+                    continue
+                # Prefer local substitution first (covers things like ". ${UTILS}/lib.sh")
+                t = _resolve_static(src, raw, self._subst(raw, env_for(src)), allowed_set, allowed_lower, windowsish)
+                if t:
+                    g.add_edge(Edge(src=_canon_case(src), dst=_canon_case(t), kind=kind,
+                                    command=cmd, dynamic=False, resolved=True, confidence=0.9,
+                                    reason="static-direct in 2R/4R"))
+                else:
+                    g.add_node(src)
+                    unresolved.append({"src": _canon_case(src), "raw_target": raw, "reason": "non-dynamic-unresolved"})
                 continue
 
+            # --- Dynamic call-sites: LLM, observation loop, then heuristic fallback ---
+            env = env_for(src)
+
             # LLM first
             targets: list[str] = []
             why = ""
             if self.client:
-                user = json.dumps({"root": str(io.root), "src": src, "command": cmd, "hints": env, "allowed_paths": allowed_list}, ensure_ascii=False)
+                allowed_json, allowed_scope = self._allowed_for_prompt(io.root, allowed_list, src)
+                user = _dumps_with_allowed({"root": str(io.root), "src": src, "command": cmd, "hints": env},
+                                           allowed_json, allowed_scope)
                 try:
                     content, meta = self.client.chat(MAPPER_PROMPT, user, return_meta=True)
                     data = _json_load(content or "{}")
@@ -919,11 +1036,9 @@ class Mapper:
             if not targets and self.client:
                 obs_payload = self._make_observations(io, src, raw, env, allowed_set)
                 if obs_payload.get("src_snippet") or obs_payload.get("dir_listings"):
-                    user2 = json.dumps({
-                        "root": str(io.root), "src": src, "command": cmd,
-                        "hints": env, "allowed_paths": allowed_list,
-                        "observations": obs_payload
-                    }, ensure_ascii=False)
+                    allowed_json, allowed_scope = self._allowed_for_prompt(io.root, allowed_list, src)
+                    user2 = _dumps_with_allowed({"root": str(io.root), "src": src, "command": cmd, "hints": env},
+                                                allowed_json, {**(allowed_scope or {}), "observations": obs_payload})
                     try:
                         content2, meta2 = self.client.chat(MAPPER_PROMPT, user2, return_meta=True)
                         data2 = _json_load(content2 or "{}")
@@ -972,7 +1087,7 @@ class Mapper:
                         continue
                     seen.add(key)
                     g.add_edge(Edge(src=src_c, dst=t_c, kind=kind, command=cmd,
-                        dynamic=bool(cs.get("dynamic", 0)),
+                        dynamic=True,
                         resolved=True, confidence=0.7, reason=why or None))
             else:
                 nonresolved += 1
@@ -1,14 +1,15 @@
 from __future__ import annotations
 import argparse
+import functools
+import importlib.util
 import yaml
 import json
 from pathlib import Path
 from .config import Config
-from .utils import disable_network
+from .utils import disable_network, dumps_indented
 from .logging_db import RunLogger
 from .scanner import Scanner
 from .exporter import write_artifacts
-from .agent_mapper import AgentMapper
 from .graph import Graph, Edge
 from .stats_cmd import summarize_graph, summarize_runs, print_graph_stats, print_run_stats  
 from .env import load_env_file
@@ -17,22 +18,36 @@ from datetime import datetime
 
 load_env_file()  # picks up OPENAI_API_KEY
 
+# libyaml's C loader when PyYAML was built with it
 try:
-    from .agents import AgentRunner, llm_from_config
-    HAS_AGENTS = True
-except Exception:
-    HAS_AGENTS = False
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as _SafeLoader
 
-try:
-    from .privacy import Redactor
-except Exception:
-    Redactor = None
+# Optional modules are imported on first use, so score/stats/watch don't pay for them.
+@functools.cache
+def _agents():
+    try:
+        from . import agents
+        return agents
+    except Exception:
+        return None
 
-try:
-    from .llm_adapter import LLMClient, LLMConfig
-    HAS_LLM = True
-except Exception:
-    HAS_LLM = False
+@functools.cache
+def _redactor_cls():
+    try:
+        from .privacy import Redactor
+        return Redactor
+    except Exception:
+        return None
+
+@functools.cache
+def _llm_adapter():
+    try:
+        from . import llm_adapter
+        return llm_adapter
+    except Exception:
+        return None
 
 def _write_outputs(root_dir: Path, out_dir: Path, g: Graph):
     """Unified, normalized artifacts (bundle-relative, fwd slashes, lowercase on Windows)."""
@@ -76,83 +91,85 @@ def _freeze_llm_specs(out_dir: Path, cfg: Config) -> None:
     (out_dir / "llm_specs.json").write_text(json.dumps(payload, indent=2), encoding="utf-8")
 
 def cmd_score(args):
-    pred = yaml.safe_load(Path(args.pred).read_text(encoding="utf-8")) or {}
-    truth = yaml.safe_load(Path(args.truth).read_text(encoding="utf-8")) or {}
+    pred = yaml.load(Path(args.pred).read_text(encoding="utf-8"), Loader=_SafeLoader) or {}
+    truth = yaml.load(Path(args.truth).read_text(encoding="utf-8"), Loader=_SafeLoader) or {}
     s = score_pair(pred, truth, case_sensitive=not args.case_insensitive, pred_prefix=getattr(args, "pred_prefix", None))
-    print(json.dumps(s.__dict__, indent=2))
+    print(dumps_indented(s.__dict__))
 
 def _llm_from_config(cfg):
-    if not HAS_LLM:
-        return None
     prov = getattr(cfg.llm, "provider", "disabled")
-    if prov == "openai":
-        return LLMClient(LLMConfig(
-            provider="openai",
-            model=getattr(cfg.llm, "model", "") or "gpt-5-mini",
-            openai_base=(getattr(cfg.llm, "openai", {}) or {}).get("base_url", "https://api.openai.com"),
-            temperature=getattr(cfg.llm, "temperature", None),
-            max_tokens=getattr(cfg.llm, "max_tokens", None),
-        ))
-    return None
+    if prov != "openai":
+        return None
+    return _llm_client(
+        getattr(cfg.llm, "model", "") or "gpt-5-mini",
+        (getattr(cfg.llm, "openai", {}) or {}).get("base_url", "https://api.openai.com"),
+        getattr(cfg.llm, "temperature", None),
+        getattr(cfg.llm, "max_tokens", None),
+    )
+
+@functools.lru_cache(maxsize=4)
+def _llm_client(model: str, openai_base: str, temperature, max_tokens):
+    """One OpenAI client (and HTTP session) per distinct LLM setting in this process."""
+    llm = _llm_adapter()
+    if llm is None:
+        return None
+    return llm.LLMClient(llm.LLMConfig(
+        provider="openai", model=model, openai_base=openai_base,
+        temperature=temperature, max_tokens=max_tokens,
+    ))
 
 def cmd_scan(args):
     cfg = Config.load(args.config)
     if not cfg.runtime.egress:
         disable_network()
-    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False))
-    logger.start(cmd="scan", config_hash=cfg.hash())
-    try:
+    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False),
+                       sync=cfg.runtime.sqlite_sync)
+    with logger.phase("scan", cfg.hash()):
         scanner = Scanner(cfg.parsing.include_ext)
         g = scanner.scan(args.folder)
         _write_outputs(Path(args.folder), Path(args.out), g)
         logger.log(
             "INFO", f"Scanned {args.folder}; nodes={len(g.nodes)} edges={len(g.edges)}"
         )
-    finally:
-        logger.finish()
 
 
 def cmd_map(args):
     cfg = Config.load(args.config)
     if not cfg.runtime.egress:
         disable_network()
-    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False))
-    logger.start(cmd="map", config_hash=cfg.hash())
-    try:
+    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False),
+                       sync=cfg.runtime.sqlite_sync)
+    with logger.phase("map", cfg.hash()):
         yml = Path(args.graph_yaml).read_text(encoding="utf-8")
-        data = yaml.safe_load(yml)
+        data = yaml.load(yml, Loader=_SafeLoader)
         g = Graph()
+        add_node, add_edge = g.add_node, g.add_edge
         for n in data.get("nodes", []):
-            g.add_node(n)
+            add_node(n)
         for e in data.get("edges", []):
-            g.add_edge(Edge(
-                src=e["src"],
-                dst=e["dst"],
-                kind=e.get("kind", "call"),
-                command=e.get("command", ""),
-                dynamic=e.get("dynamic", False),
-                resolved=e.get("resolved", True),
-                confidence=e.get("confidence", 0.9),
-            ))
+            get = e.get
+            # positional: src, dst, kind, command, dynamic, resolved, confidence
+            add_edge(Edge(e["src"], e["dst"], get("kind", "call"), get("command", ""),
+                          get("dynamic", False), get("resolved", True), get("confidence", 0.9)))
+        from .agent_mapper import AgentMapper
         agent = AgentMapper(client=_llm_from_config(cfg))
         # Use the YAML's directory as root when possible
         root_dir = Path(args.root or Path(args.graph_yaml).parent).resolve()
         g2 = agent.map_bundle(str(root_dir), g)
         _write_outputs(root_dir, Path(args.out), g2)
         logger.log("INFO", f"Mapped dynamic edges; edges={len(g2.edges)}")
-    finally:
-        logger.finish()
 
 
 def cmd_all(args):
     cfg = Config.load(args.config)
     if not cfg.runtime.egress:
         disable_network()
-    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False))
-    logger.start(cmd="all", config_hash=cfg.hash())
-    try:
+    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False),
+                       sync=cfg.runtime.sqlite_sync)
+    with logger.phase("all", cfg.hash()):
         scanner = Scanner(cfg.parsing.include_ext)
         g = scanner.scan(args.folder)
+        from .agent_mapper import AgentMapper
         agent = AgentMapper(client=_llm_from_config(cfg))
         g2 = agent.map_bundle(args.folder, g)
         _write_outputs(Path(args.folder), Path(args.out), g2)
@@ -160,32 +177,30 @@ def cmd_all(args):
         logger.log(
             "INFO", f"Completed scan+map; nodes={len(g2.nodes)} edges={len(g2.edges)}"
         )
-    finally:
-        logger.finish()
 
 def cmd_agents(args):
-    if not HAS_AGENTS:
+    agents = _agents()
+    if agents is None:
         raise SystemExit("Multi-agent module not found. Ensure scriptgraph/agents.py etc. are present.")
     cfg = Config.load(args.config)
     if not cfg.runtime.egress:
         disable_network()
-    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False))
-    logger.start(cmd=f"agents-{args.roles}", config_hash=cfg.hash())
-    try:
+    logger = RunLogger(cfg.runtime.sqlite_path, echo=getattr(args, "verbose", False),
+                       sync=cfg.runtime.sqlite_sync)
+    with logger.phase(f"agents-{args.roles}", cfg.hash()):
         scanner = Scanner(cfg.parsing.include_ext)
         g = scanner.scan(args.folder)
-        client = llm_from_config(cfg)
+        client = agents.llm_from_config(cfg)
+        Redactor = _redactor_cls()
         red = Redactor(cfg.privacy.redact_paths, cfg.privacy.redact_ips, cfg.privacy.redact_emails) if Redactor else None
         use_hints = bool(args.reader_hints or getattr(getattr(cfg, "agents", {}), "reader_hints", False))
-        runner = AgentRunner(args.roles, client, logger,
+        runner = agents.AgentRunner(args.roles, client, logger,
                              log_prompts=bool(getattr(cfg.privacy, "log_prompts", False)),
                              redactor=red,
                              use_llm_reader_hints=use_hints)
         g2 = runner.run(args.folder, g, args.out)
         _freeze_llm_specs(Path(args.out), cfg)
         logger.log("INFO", f"agents {args.roles} finished; nodes={len(g2.nodes)} edges={len(g2.edges)}")
-    finally:
-        logger.finish()
 
 def cmd_stats_graph(args):
     gs = summarize_graph(args.graph_yaml)
@@ -208,19 +223,23 @@ def cmd_watch(args):
     db = cfg.runtime.sqlite_path
     if not os.path.exists(db):
         print("No DB yet:", db); return
-    conn = sqlite3.connect(db)
+    # autocommit reader: never holds a transaction open against the writer
+    # (RunLogger already puts the DB in WAL mode; setting it here would write the header)
+    conn = sqlite3.connect(db, isolation_level=None)
     cur = conn.cursor()
     last_id = cur.execute("SELECT COALESCE(MAX(id),0) FROM events").fetchone()[0]
     print("Watching", db, "from id", last_id)
+    sql = "SELECT id, ts, level, msg FROM events WHERE id > ? ORDER BY id ASC"
+    sleep = 0.1
     try:
         while True:
-            rows = list(cur.execute(
-                "SELECT id, ts, level, msg FROM events WHERE id > ? ORDER BY id ASC", (last_id,)
-            ))
+            rows = cur.execute(sql, (last_id,)).fetchall()
             for rid, ts, level, msg in rows:
                 print(f"[{ts}] {level:5s} {msg}")
                 last_id = rid
-            time.sleep(0.5)
+            # poll quickly while events arrive, back off to 2s when idle
+            sleep = 0.1 if rows else min(sleep * 2, 2.0)
+            time.sleep(sleep)
     except KeyboardInterrupt:
         pass
 
@@ -279,8 +298,8 @@ def main():
     pscr.add_argument("--pred-prefix", help="Prefix to prepend to predicted paths before scoring")
     pscr.set_defaults(func=cmd_score)
 
-    # multi-agent subcommand (only shows if module present)
-    if HAS_AGENTS:
+    # multi-agent subcommand (only shows if module present; found without importing it)
+    if importlib.util.find_spec(f"{__package__}.agents") is not None:
         pag = sub.add_parser("agents", help="Run multi-role agent pipeline (2R or 4R)")
         pag.add_argument("folder", help="Root folder to scan")
         pag.add_argument("--roles", default="4R", choices=["2R", "4R"], help="Agent configuration")
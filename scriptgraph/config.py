@@ -2,13 +2,15 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import List, Dict, Any
 import hashlib
-import io
+import json
+import os
 import yaml
 
 @dataclass
 class RuntimeCfg:
     egress: bool = False
     sqlite_path: str = "./out/runlog.sqlite"
+    sqlite_sync: str = "NORMAL"  # OFF | NORMAL | FULL (OFF only for throwaway runs)
 
 @dataclass
 class LlmCfg:
@@ -54,9 +56,18 @@ class Config:
     privacy: PrivacyCfg = field(default_factory=PrivacyCfg)
     parsing: ParsingCfg = field(default_factory=ParsingCfg)
     agents: AgentsCfg = field(default_factory=AgentsCfg)
+    # memoized hash(); configs are not mutated after load()
+    _cached_hash: str | None = field(default=None, repr=False, compare=False)
 
     @staticmethod
     def load(path: str) -> "Config":
+        # re-loads of an unchanged file are served from cache; a new mtime invalidates
+        try:
+            key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+        except OSError:
+            key = None
+        if key is not None and key in _CFG_CACHE:
+            return _CFG_CACHE[key]
         with open(path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f) or {}
 
@@ -71,18 +82,27 @@ class Config:
         privacy = PrivacyCfg(**merged(PrivacyCfg(), data.get("privacy", {})))
         parsing = ParsingCfg(**merged(ParsingCfg(), data.get("parsing", {})))
         agents  = AgentsCfg(**merged(AgentsCfg(),  data.get("agents", {})))
-        return Config(llm=llm, runtime=runtime, privacy=privacy, parsing=parsing, agents=agents)
+        cfg = Config(llm=llm, runtime=runtime, privacy=privacy, parsing=parsing, agents=agents)
+        if key is not None:
+            _CFG_CACHE[key] = cfg
+        return cfg
 
     def hash(self) -> str:
-        buf = io.StringIO()
-        yaml.safe_dump(
+        if self._cached_hash is not None:
+            return self._cached_hash
+        # canonical JSON: deterministic like the old sorted YAML dump, via the C encoder
+        s = json.dumps(
             {
                 "llm": self.llm.__dict__,
                 "runtime": self.runtime.__dict__,
                 "privacy": self.privacy.__dict__,
                 "parsing": self.parsing.__dict__,
             },
-            buf,
             sort_keys=True,
+            separators=(",", ":"),
         )
-        return hashlib.sha256(buf.getvalue().encode()).hexdigest()[:12]
+        self._cached_hash = hashlib.sha256(s.encode()).hexdigest()[:12]
+        return self._cached_hash
+
+# (abspath, st_mtime_ns) -> loaded Config
+_CFG_CACHE: Dict[tuple[str, int], Config] = {}
@@ -1,22 +1,23 @@
+import functools
 import os
+import re
+
+# KEY=value per line; comment lines (#...) and lines without '=' don't match
+_ENV_RE = re.compile(r"^[ \t]*([^#=\s][^=\n]*?)[ \t]*=(.*)$", re.M)
+
+@functools.lru_cache(maxsize=8)
+def _parse_env(path: str, mtime_ns: int) -> tuple[tuple[str, str], ...]:
+    """(key, value) pairs of an env file; cached until the file's mtime changes."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = f.read()
+    return tuple((m.group(1), m.group(2).strip().strip('"').strip("'")) for m in _ENV_RE.finditer(data))
 
 def load_env_file(path: str = ".env") -> None:
-    if not os.path.exists(path):
-        return
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            for raw in f:
-                line = raw.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if "=" not in line:
-                    continue
-                k, v = line.split("=", 1)
-                k = k.strip()
-                v = v.strip().strip('"').strip("'")
-                # don't overwrite if already set in the environment
-                if k and k not in os.environ:
-                    os.environ[k] = v
+        pairs = _parse_env(os.path.abspath(path), os.stat(path).st_mtime_ns)
     except Exception:
-        # fail open: if .env can't be read, just skip
-        pass
+        # fail open: if .env is missing or can't be read, just skip
+        return
+    for k, v in pairs:
+        # don't overwrite if already set in the environment
+        os.environ.setdefault(k, v)
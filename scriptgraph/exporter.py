@@ -3,16 +3,10 @@ import json
 from pathlib import Path
 from .graph import Graph
 
-def _canon_rel(p: str, root: Path, windows: bool) -> str:
-    s = (p or "").strip().replace("\\", "/")
-    if s.startswith("./"): s = s[2:]
-    try:
-        pp = Path(s)
-        if pp.is_absolute():
-            s = pp.relative_to(root).as_posix()
-    except Exception:
-        pass
-    return s.lower() if windows else s
+try:
+    import orjson  # optional, faster run_report.json encoding
+except ImportError:  # pragma: no cover
+    orjson = None
 
 def write_artifacts(
     *,
@@ -57,26 +51,21 @@ def write_artifacts(
         graph.nodes = {n: meta for n, meta in graph.nodes.items() if n in used}
 
     # YAML export
-    nodes = sorted({ _canon_rel(n, root, windows) for n in graph.nodes.keys() })
-    lines = ["nodes:\n"] + [f"  - {json.dumps(n)}\n" for n in nodes]
-    lines.append("edges:\n")
-    for e in graph.edges:
-        src = _canon_rel(e.src, root, windows)
-        dst = _canon_rel(e.dst, root, windows)
-        lines += [f"  - src: {json.dumps(src)}\n", f"    dst: {json.dumps(dst)}\n", f"    kind: {json.dumps(e.kind)}\n"]
-        if getattr(e, "command", None):   lines.append(f"    command: {json.dumps(e.command)}\n")
-        if getattr(e, "dynamic", None) is not None:   lines.append(f"    dynamic: {str(bool(e.dynamic)).lower()}\n")
-        if getattr(e, "resolved", None) is not None:  lines.append(f"    resolved: {str(bool(e.resolved)).lower()}\n")
-        if getattr(e, "confidence", None) is not None: lines.append(f"    confidence: {float(e.confidence):.3f}\n")
-        if getattr(e, "reason", None):    lines.append(f"    reason: {json.dumps(e.reason)}\n")
     out_dir.mkdir(parents=True, exist_ok=True)
-    (out_dir / "predicted_graph.yaml").write_text("".join(lines), encoding="utf-8")
-    (out_dir / "graph.dot").write_text(graph.to_dot(), encoding="utf-8")
+    with (out_dir / "predicted_graph.yaml").open("w", encoding="utf-8", buffering=1 << 20) as fh:
+        graph.write_yaml(fh, root, windows)
+    with (out_dir / "graph.dot").open("w", encoding="utf-8", buffering=1 << 16) as fh:
+        graph.write_dot(fh)
     
     if create_run_report:
-        (out_dir / "run_report.json").write_text(json.dumps({
-            "coverage": coverage, "unresolved": unresolved[:50],
-        }, indent=2), encoding="utf-8")
+        report = {"coverage": coverage, "unresolved": unresolved[:50]}
+        report_path = out_dir / "run_report.json"
+        if orjson is not None:
+            # coverage counts and unresolved entries are plain str/int/list/dict values,
+            # all of which orjson encodes (non-str keys as json.dumps would)
+            report_path.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
         if logger:
             logger.log("INFO", f"Artifacts: {out_dir/'predicted_graph.yaml'} ; {out_dir/'run_report.json'}")
     else:
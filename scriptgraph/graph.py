@@ -1,8 +1,11 @@
 from __future__ import annotations
-from dataclasses import dataclass, field, asdict
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Iterator
 from .utils import canon
 
-@dataclass
+@dataclass(slots=True)  # no per-edge __dict__: parsers create one of these per call site
 class Edge:
     src: str
     dst: str
@@ -28,24 +31,83 @@ class Graph:
         self.add_node(e.src)
         self.add_node(e.dst)
 
+    def add_edges(self, edges) -> None:
+        """add_edge() for each edge in order, with the per-call overhead paid once."""
+        append, setnode = self.edges.append, self.nodes.setdefault
+        for e in edges:
+            e.src = canon(e.src)
+            e.dst = canon(e.dst)
+            append(e)
+            setnode(canon(e.src), {})  # as add_node(): canon() again ("././x" -> "./x" -> "x")
+            setnode(canon(e.dst), {})
+
     def to_yaml(self) -> str:
-        import yaml
-        data = {
-            "nodes": sorted(list(self.nodes.keys())),
-            "edges": [asdict(e) for e in self.edges],
-        }
-        return yaml.safe_dump(data, sort_keys=False)
+        return _emit_yaml(self)
 
-    def to_dot(self) -> str:
+    def _dot_lines(self) -> Iterator[str]:
         def color(e: Edge) -> str:
             if not e.resolved:
                 return "orange"
             return "black" if not e.dynamic else "blue"
-        lines = ["digraph ScriptGraph {", "  rankdir=LR;"]
+        yield "digraph ScriptGraph {"
+        yield "  rankdir=LR;"
         for n in sorted(self.nodes.keys()):
-            lines.append(f'  "{n}";')
+            yield f'  "{n}";'
         for e in self.edges:
             label = e.kind
-            lines.append(f'  "{e.src}" -> "{e.dst}" [label="{label}", color="{color(e)}"];')
-        lines.append("}")
-        return "\n".join(lines)
+            yield f'  "{e.src}" -> "{e.dst}" [label="{label}", color="{color(e)}"];'
+        yield "}"
+
+    def to_dot(self) -> str:
+        return "\n".join(self._dot_lines())
+
+    def write_dot(self, fh: IO[str]) -> None:
+        """Write to_dot() to an open text file without building the whole string."""
+        sep = ""
+        for line in self._dot_lines():
+            fh.write(sep); fh.write(line); sep = "\n"
+
+    def write_yaml(self, fh: IO[str], root: Path | None = None, windows: bool = False) -> None:
+        """Write the YAML export to an open text file without building the whole string."""
+        fh.writelines(_yaml_lines(self, root, windows))
+
+def _canon_rel(p: str, root: Path, windows: bool) -> str:
+    s = (p or "").strip().replace("\\", "/")
+    if s.startswith("./"): s = s[2:]
+    try:
+        pp = Path(s)
+        if pp.is_absolute():
+            s = pp.relative_to(root).as_posix()
+    except Exception:
+        pass
+    return s.lower() if windows else s
+
+def _emit_yaml(graph: Graph, root: Path | None = None, windows: bool = False) -> str:
+    return "".join(_yaml_lines(graph, root, windows))
+
+def _yaml_lines(graph: Graph, root: Path | None = None, windows: bool = False) -> Iterator[str]:
+    """Graph as YAML lines (scalars JSON-quoted, which YAML accepts), ready for writelines().
+    With 'root', paths are made root-relative (and lowercased for Windows bundles)."""
+    # canonicalize and quote each distinct path/kind once, not per reference
+    paths = set(graph.nodes)
+    for e in graph.edges:
+        paths.add(e.src); paths.add(e.dst)
+    rel = {p: p for p in paths} if root is None else {p: _canon_rel(p, root, windows) for p in paths}
+    quoted: dict[str, str] = {}
+    def q(v: str) -> str:
+        out = quoted.get(v)
+        if out is None:
+            out = quoted[v] = json.dumps(v)
+        return out
+    nodes = sorted({rel[n] for n in graph.nodes.keys()})
+    yield "nodes:\n"
+    for n in nodes:
+        yield f"  - {q(n)}\n"
+    yield "edges:\n"
+    for e in graph.edges:
+        yield f"  - src: {q(rel[e.src])}\n    dst: {q(rel[e.dst])}\n    kind: {q(e.kind)}\n"
+        if getattr(e, "command", None):   yield f"    command: {json.dumps(e.command)}\n"
+        if getattr(e, "dynamic", None) is not None:   yield f"    dynamic: {str(bool(e.dynamic)).lower()}\n"
+        if getattr(e, "resolved", None) is not None:  yield f"    resolved: {str(bool(e.resolved)).lower()}\n"
+        if getattr(e, "confidence", None) is not None: yield f"    confidence: {float(e.confidence):.3f}\n"
+        if getattr(e, "reason", None):    yield f"    reason: {json.dumps(e.reason)}\n"
@@ -2,6 +2,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
 
+try:
+    import orjson  # optional, faster response parsing
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 @dataclass
 class LLMConfig:
@@ -16,6 +21,15 @@ class LLMConfig:
 class LLMClient:
     def __init__(self, cfg: LLMConfig):
         self.cfg = cfg
+        self._session = None  # requests.Session, created on the first OpenAI call
+
+    def _http(self, api_key: str):
+        """Keep-alive session reused across calls (one TCP/TLS handshake per client)."""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers.update({"Authorization": f"Bearer {api_key}"})
+        return self._session
 
     def chat(self, system: str, user: str, *, return_meta: bool = False, **extra):
         if self.cfg.provider == "disabled":
@@ -27,7 +41,7 @@ class LLMClient:
         return (content, meta) if return_meta else content
 
     def _openai_chat(self, system: str, user: str, **extra) -> tuple[str, dict]:
-        import os, requests, json, time
+        import os, time
         api_key = os.environ.get("OPENAI_API_KEY"); assert api_key, "OPENAI_API_KEY not set"
         url = f"{self.cfg.openai_base}/v1/chat/completions"
         model = self.cfg.model or "gpt-5-mini"
@@ -43,10 +57,10 @@ class LLMClient:
         payload.update(extra)
 
         t0 = time.monotonic()
-        resp = requests.post(url, headers={"Authorization": f"Bearer {api_key}"}, json=payload, timeout=60)
+        resp = self._http(api_key).post(url, json=payload, timeout=60)
         dt = (time.monotonic() - t0) * 1000.0
         try:
-            body = resp.json()
+            body = orjson.loads(resp.content) if orjson is not None else resp.json()
         except Exception:
             body = {"error": {"message": resp.text}}
         if resp.status_code >= 400:
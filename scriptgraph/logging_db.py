@@ -1,6 +1,9 @@
 from __future__ import annotations
 import sqlite3
 import json
+import math
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -55,46 +58,126 @@ CREATE TABLE IF NOT EXISTS role_latencies(
   seconds REAL NOT NULL,
   FOREIGN KEY(run_id) REFERENCES runs(id)
 );
+CREATE INDEX IF NOT EXISTS idx_events_run_id ON events(run_id, id);
+CREATE INDEX IF NOT EXISTS idx_llm_calls_run_id ON llm_calls(run_id, ts);
+CREATE INDEX IF NOT EXISTS idx_role_lat_run_id ON role_latencies(run_id);
 """
 
+_SQL_EVENT = "INSERT INTO events(run_id, ts, level, msg) VALUES (?, ?, ?, ?)"
+_SQL_LLM = (
+    "INSERT INTO llm_calls(run_id, ts, role, model, endpoint, prompt_chars, "
+    "input_tokens, output_tokens, total_tokens, latency_ms, src, command_snippet, "
+    "targets_count, status, reasoning) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_PROMPT = "INSERT INTO llm_prompts(run_id, ts, role, prompt) VALUES (?, ?, ?, ?)"
+_SQL_LATENCY = "INSERT INTO role_latencies(run_id, role, seconds) VALUES (?, ?, ?)"
+
+_SYNC_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Rows buffered per table before an executemany + commit
+FLUSH_ROWS = 128
+
+# per-process cache: [epoch second, "YYYY-MM-DDTHH:MM:SS"] of the last timestamp formatted
+_ISO_SECOND: list = [None, ""]
+
+def _utc_iso() -> str:
+    """Same string as datetime.utcnow().isoformat(); the formatted seconds part is cached
+    and only rebuilt when the second changes."""
+    frac, whole = math.modf(time.time())
+    us = round(frac * 1e6)
+    if us >= 1000000:
+        whole += 1; us -= 1000000
+    sec = int(whole)
+    if _ISO_SECOND[0] != sec:
+        _ISO_SECOND[0] = sec
+        _ISO_SECOND[1] = datetime.utcfromtimestamp(sec).isoformat()
+    return f"{_ISO_SECOND[1]}.{us:06d}" if us else _ISO_SECOND[1]
+
 @dataclass
 class Run:
     id: int
 
 class RunLogger:
-    def __init__(self, path: str, echo: bool = False):
+    def __init__(self, path: str, echo: bool = False, sync: str = "NORMAL"):
         self.path = path
         self.echo = echo
         Path(path).parent.mkdir(parents=True, exist_ok=True)
         self.conn = sqlite3.connect(path)
+        # WAL: one fsync per checkpoint instead of per commit, and `watch` readers don't block us
+        sync = str(sync or "NORMAL").upper()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={sync if sync in _SYNC_MODES else 'NORMAL'}")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        # a run's log fits in WAL + page cache; checkpoint once in finish() instead of every 1000 pages
+        self.conn.execute("PRAGMA wal_autocheckpoint=10000")
+        self.conn.execute("PRAGMA cache_size=-65536")
         self.conn.executescript(SCHEMA)
         self.conn.commit()
+        # one cursor for all inserts; sqlite3's statement cache keeps the INSERTs prepared
+        self._cur = self.conn.cursor()
         self._run_id: int | None = None
+        # pending rows per table, written by flush()
+        self._ev_buf: list[tuple] = []
+        self._llm_buf: list[tuple] = []
+        self._prompt_buf: list[tuple] = []
+        self._lat_buf: list[tuple] = []
+        self._in_phase = False
 
     @property
     def run_id(self) -> int | None:
         return self._run_id
 
     def start(self, cmd: str, config_hash: str) -> Run:
-        cur = self.conn.cursor()
+        cur = self._cur
         cur.execute(
             "INSERT INTO runs(started_at, cmd, config_hash) VALUES (?, ?, ?)",
-            (datetime.utcnow().isoformat(), cmd, config_hash),
+            (_utc_iso(), cmd, config_hash),
         )
         self.conn.commit()
         self._run_id = cur.lastrowid
         return Run(id=self._run_id)
 
+    @contextmanager
+    def phase(self, cmd: str, config_hash: str):
+        """start() ... finish() around one CLI phase; rows written inside it are committed
+        once at the end (or per flush when echoing, so `watch` still sees events live)."""
+        self.start(cmd, config_hash)
+        self._in_phase = True
+        try:
+            yield self
+        finally:
+            self._in_phase = False
+            self.finish()
+
+    def flush(self):
+        """Write all buffered rows; committed right away unless inside phase()."""
+        wrote = False
+        for sql, buf in ((_SQL_EVENT, self._ev_buf), (_SQL_LLM, self._llm_buf),
+                         (_SQL_PROMPT, self._prompt_buf), (_SQL_LATENCY, self._lat_buf)):
+            if buf:
+                self._cur.executemany(sql, buf)
+                buf.clear()
+                wrote = True
+        if wrote and (self.echo or not self._in_phase):
+            self.conn.commit()
+
+    def _buffer(self, buf: list[tuple], row: tuple):
+        buf.append(row)
+        if len(buf) >= FLUSH_ROWS:
+            self.flush()
+
     def log(self, level: str, msg: str):
         assert self._run_id is not None
-        ts = datetime.utcnow().isoformat()
-        self.conn.execute(
-            "INSERT INTO events(run_id, ts, level, msg) VALUES (?, ?, ?, ?)",
-            (self._run_id, ts, level.upper(), msg),
-        )
-        self.conn.commit()
+        ts = _utc_iso()
+        self._ev_buf.append((self._run_id, ts, level.upper(), msg))
         if self.echo:                        # <-- NEW
+            # interactive runs: keep events visible to `scriptgraph watch` right away
+            self.flush()
             print(f"[{ts}] {level.upper():5s} {msg}")
+        elif len(self._ev_buf) >= FLUSH_ROWS:
+            self.flush()
 
     def log_llm(self, *, role: str, model: str = "", endpoint: str = "",
                 prompt_chars: int = 0, input_tokens: int | None = None,
@@ -104,51 +187,42 @@ class RunLogger:
                 reasoning: str | None = None):
         """Record one LLM call (tokens may be None if API doesn't return them)."""
         assert self._run_id is not None
-        self.conn.execute(
-            "INSERT INTO llm_calls(run_id, ts, role, model, endpoint, prompt_chars, "
-            "input_tokens, output_tokens, total_tokens, latency_ms, src, command_snippet, "
-            "targets_count, status, reasoning) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                self._run_id,
-                datetime.utcnow().isoformat(),
-                role, model, endpoint,
-                int(prompt_chars),
-                input_tokens, output_tokens, total_tokens,
-                float(latency_ms),
-                src,
-                (command_snippet or "")[:400],
-                targets_count,
-                status,
-                (reasoning or "")[:1000],
-            ),
-        )
-        self.conn.commit()
+        self._buffer(self._llm_buf, (
+            self._run_id,
+            _utc_iso(),
+            role, model, endpoint,
+            int(prompt_chars),
+            input_tokens, output_tokens, total_tokens,
+            float(latency_ms),
+            src,
+            (command_snippet or "")[:400],
+            targets_count,
+            status,
+            (reasoning or "")[:1000],
+        ))
 
     def log_prompt(self, *, role: str, prompt: str):
         """Record the exact prompt (pre-redacted upstream). Controlled by cfg.privacy.log_prompts."""
         assert self._run_id is not None
-        self.conn.execute(
-            "INSERT INTO llm_prompts(run_id, ts, role, prompt) VALUES (?, ?, ?, ?)",
-            (self._run_id, datetime.utcnow().isoformat(), role, prompt[:4000]),
-        )
-        self.conn.commit()
+        self._buffer(self._prompt_buf, (self._run_id, _utc_iso(), role, prompt[:4000]))
 
     def log_role_latency(self, role: str, seconds: float):
         assert self._run_id is not None
-        self.conn.execute(
-            "INSERT INTO role_latencies(run_id, role, seconds) VALUES (?, ?, ?)",
-            (self._run_id, role, float(seconds)),
-        )
-        self.conn.commit()
+        self._buffer(self._lat_buf, (self._run_id, role, float(seconds)))
 
     def finish(self):
         if self._run_id is not None:
-            ts = datetime.utcnow().isoformat()
+            self.flush()
+            ts = _utc_iso()
             self.conn.execute(
                 "UPDATE runs SET finished_at=? WHERE id=?",
                 (ts, self._run_id),
             )
             self.conn.commit()
+            try:
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error:
+                pass  # a concurrent reader holds the WAL; SQLite checkpoints later
             if self.echo:
                 print(f"[{ts}] FINISH run_id={self._run_id}")
             self.conn.close()
@@ -1,14 +1,24 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, Any, Set, Tuple, List, Optional
-import yaml, json
+import functools
 import re
+import string
+from .utils import dumps_indented, load_yaml
+
+_LEADING_DOTSLASH_RE = re.compile(r"^(?:\./)+")
+_DRIVE_LETTERS = frozenset(string.ascii_letters)
 
 # ---- Canonicalization (matches thesis metric spec) -------------------------
 def _canon_path(p: str, case_sensitive: bool = True) -> str:
     if not isinstance(p, str): return ""
+    return _canon_str(p, case_sensitive)
+
+# Graphs repeat the same src/dst strings across edges; normalize each distinct one once.
+@functools.lru_cache(maxsize=65536)
+def _canon_str(p: str, case_sensitive: bool) -> str:
     s = p.replace("\\", "/")
-    while s.startswith("./"): s = s[2:]
+    if s.startswith("./"): s = _LEADING_DOTSLASH_RE.sub("", s, count=1)
     # collapse // and resolve . and ..
     parts = []
     for seg in s.split("/"):
@@ -23,21 +33,30 @@ def _canon_path(p: str, case_sensitive: bool = True) -> str:
 def _maybe_prefix(p: str, prefix: Optional[str]) -> str:
     if not prefix:
         return p
-    # Don't double-prefix absolute/anchored paths
-    if p.startswith("/") or re.match(r"^[A-Za-z]:", p):
+    return _prefixed(p, prefix)
+
+@functools.lru_cache(maxsize=65536)
+def _prefixed(p: str, prefix: str) -> str:
+    # Don't double-prefix absolute/anchored paths (leading "/" or a drive letter like "C:")
+    if p.startswith("/") or (p[1:2] == ":" and p[:1] in _DRIVE_LETTERS):
         return p
-    if p.startswith(prefix.rstrip("/") + "/"):
+    base = prefix.rstrip("/")
+    if p.startswith(base + "/"):
         return p
-    return f"{prefix.rstrip('/')}/{p.lstrip('./')}"
+    return f"{base}/{p.lstrip('./')}"
 
 def _canon_graph(obj: Dict[str, Any], case_sensitive: bool, *, prefix: Optional[str] = None) -> Dict[str, Any]:
-    nodes = set(_canon_path(_maybe_prefix(n, prefix), case_sensitive) for n in (obj.get("nodes") or []))
-    edges = set()
-    for e in (obj.get("edges") or []):
-        src = _canon_path(_maybe_prefix(e.get("src",""), prefix), case_sensitive)
-        dst = _canon_path(_maybe_prefix(e.get("dst",""), prefix), case_sensitive)
-        kind = (e.get("kind") or "call").strip()
-        edges.add((src, dst, kind))
+    # case_sensitive/prefix are fixed for the whole graph: pick the endpoint normalizer once
+    if prefix:
+        def norm(p, _canon=_canon_path, _pre=_prefixed, _cs=case_sensitive, _prefix=prefix):
+            return _canon(_pre(p, _prefix), _cs)
+    else:
+        norm = functools.partial(_canon_path, case_sensitive=case_sensitive)
+    nodes = {norm(n) for n in (obj.get("nodes") or ())}
+    edges = {
+        (norm(e.get("src", "")), norm(e.get("dst", "")), (e.get("kind") or "call").strip())
+        for e in (obj.get("edges") or ())
+    }
     return {"nodes": nodes, "edges": edges}
 
 def _prf(pred: Set, truth: Set):
@@ -61,10 +80,6 @@ def score_pair(pred: Dict[str,Any], truth: Dict[str,Any], *, case_sensitive=True
     gcr = 1 if (P["nodes"]==T["nodes"] and P["edges"]==T["edges"]) else 0
     return Scores(pn,rn,fn, pe,re,fe, gcr)
 
-def _load_yaml(path: str) -> Dict[str,Any]:
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
-
 def cli():
     import argparse
     ap = argparse.ArgumentParser(description="Score predicted_graph.yaml against ground truth.")
@@ -74,10 +89,10 @@ def cli():
                     help="Use for Windows-only bundles.")
     ap.add_argument("--pred-prefix", help="Prefix to prepend to predicted paths before scoring.")
     args = ap.parse_args()
-    s = score_pair(_load_yaml(args.pred), _load_yaml(args.truth),
+    s = score_pair(load_yaml(args.pred), load_yaml(args.truth),
                     case_sensitive=not args.case_insensitive,
                     pred_prefix=args.pred_prefix)
-    print(json.dumps(s.__dict__, indent=2))
+    print(dumps_indented(s.__dict__))
 
 if __name__ == "__main__":
     cli()
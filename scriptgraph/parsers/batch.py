@@ -2,7 +2,7 @@ from __future__ import annotations
 import re
 from pathlib import Path
 from ..graph import Edge
-from ..utils import strip_comments
+from ..utils import compile_prefilter, lines_with, strip_comments
 
 
 CALL_RE = re.compile(r"(?:call\s+)?([\w./\\-]+\.(?:bat|cmd))", re.IGNORECASE)
@@ -13,11 +13,13 @@ PS_CALL_RE = re.compile(r"""(?ix)
     (?:-File\s+)?["']?([\w./\\-]+\.ps1)["']?
 """)
 VAR_HINT = re.compile(r"%[A-Za-z_][A-Za-z0-9_]*%")
+# Both call patterns need one of these extensions; only lines containing one are parsed.
+PREFILTER = compile_prefilter(r"(?i)\.(?:bat|cmd|ps1)")
 
 
 def parse_batch(root: Path, src_path: str, text: str):
     edges = []
-    for raw in text.splitlines():
+    for raw in lines_with(text, PREFILTER):
         line = strip_comments(raw)
         if not line.strip():
             continue
@@ -2,29 +2,34 @@ from __future__ import annotations
 import re
 from pathlib import Path
 from ..graph import Edge
-from ..utils import strip_comments
+from ..utils import compile_prefilter, lines_with, strip_comments
 
 CALL_RE = re.compile(
     r"(?:system|exec)\s*\(\s*['\"]([^'\"]+\.(?:sh|pl|bat|cmd|ps1))['\"]"
 )
 DYN_HINT = re.compile(r"\$[A-Za-z_]|`|\$\(")
+# CALL_RE needs 'system' or 'exec'; only lines containing one are parsed
+PREFILTER = compile_prefilter(r"system|exec")
 
 
 def parse_perl(root: Path, src_path: str, text: str):
     edges = []
-    for raw in text.splitlines():
+    for raw in lines_with(text, PREFILTER):
         line = strip_comments(raw)
         if not line.strip():
             continue
+        dynamic = None
         for m in CALL_RE.findall(line):
+            if dynamic is None:
+                dynamic = bool(DYN_HINT.search(line))
             edges.append(
                 Edge(
                     src=src_path,
                     dst=m,
                     kind="call",
                     command=line,
-                    dynamic=bool(DYN_HINT.search(line)),
-                    resolved=not bool(DYN_HINT.search(line)),
+                    dynamic=dynamic,
+                    resolved=not dynamic,
                     confidence=0.7,
                 )
             )
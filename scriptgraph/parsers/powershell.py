@@ -2,17 +2,19 @@ from __future__ import annotations
 import re
 from pathlib import Path
 from ..graph import Edge
-from ..utils import strip_comments
+from ..utils import compile_prefilter, lines_with, strip_comments
 
 # & "./x.ps1" or & '.\x.ps1' or ./x.ps1 or . .\x.ps1 (dot-sourcing)
 CALL_RE = re.compile(r"(?:&\s+)?['\"]?([\w./\\-]+\.ps1)['\"]?")
 DOTSRC_RE = re.compile(r"^\s*\.\s+['\"]?([\w./\\-]+\.ps1)['\"]?")
 DYN_HINT = re.compile(r"\$[A-Za-z_][A-Za-z0-9_]*|\$\(|Invoke-Expression")
+# CALL_RE needs a literal .ps1; only lines containing it are parsed
+PREFILTER = compile_prefilter(r"\.ps1")
 
 
 def parse_powershell(root: Path, src_path: str, text: str):
     edges = []
-    for raw in text.splitlines():
+    for raw in lines_with(text, PREFILTER):
         line = strip_comments(raw)
         if not line.strip():
             continue
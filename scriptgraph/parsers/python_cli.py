@@ -5,30 +5,32 @@ from ..graph import Edge
 
 
 SHELL_EXTS = {".sh", ".bash", ".ksh", ".cmd", ".bat", ".ps1", ".py"}
+_SHELL_EXTS = tuple(sorted(SHELL_EXTS))
+TARGETS = frozenset({"run", "Popen", "call", "system"})
 
 
-class CallVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.cmds: list[tuple[int, str]] = []
-
-    def visit_Call(self, node: ast.Call):
-        # subprocess.run(["bash", "./x.sh"]) or os.system("./y.sh")
-        try:
-            func = getattr(node.func, "attr", getattr(node.func, "id", ""))
-        except Exception:
-            func = ""
-        if func in {"run", "Popen", "call", "system"}:
-            if not node.args:
-                self.generic_visit(node); return
-            arg0 = node.args[0]
-            # subprocess.run(["bash","./x.sh", ...])
-            if isinstance(arg0, ast.List) and all(isinstance(e, ast.Constant) and isinstance(e.value, str) for e in arg0.elts):
-                val = " ".join(e.value for e in arg0.elts)
-                self.cmds.append((node.lineno, val))
-            # os.system("./x.sh") / subprocess.run("bash ./x.sh")
-            elif isinstance(arg0, ast.Constant) and isinstance(arg0.value, str):
-                self.cmds.append((node.lineno, arg0.value))
-        self.generic_visit(node)
+def _commands(tree: ast.AST) -> list[tuple[int, str]]:
+    """(lineno, command) of every run/Popen/call/system call whose first arg is a literal,
+    in source (pre-order) order. Iterative walk: no per-node visitor dispatch."""
+    cmds: list[tuple[int, str]] = []
+    stack = [tree]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, ast.Call) and n.args:
+            f = n.func
+            name = f.attr if isinstance(f, ast.Attribute) else (f.id if isinstance(f, ast.Name) else None)
+            if name in TARGETS:
+                arg0 = n.args[0]
+                # subprocess.run(["bash","./x.sh", ...])
+                if isinstance(arg0, ast.List) and all(isinstance(e, ast.Constant) and isinstance(e.value, str) for e in arg0.elts):
+                    cmds.append((n.lineno, " ".join(e.value for e in arg0.elts)))
+                # os.system("./x.sh") / subprocess.run("bash ./x.sh")
+                elif isinstance(arg0, ast.Constant) and isinstance(arg0.value, str):
+                    cmds.append((n.lineno, arg0.value))
+        children = list(ast.iter_child_nodes(n))
+        children.reverse()  # pop in source order
+        stack.extend(children)
+    return cmds
 
 
 def parse_python_cli(root: Path, src_path: str, text: str):
@@ -37,24 +39,19 @@ def parse_python_cli(root: Path, src_path: str, text: str):
         tree = ast.parse(text)
     except Exception:
         return edges
-    v = CallVisitor()
-    v.visit(tree)
-    for _, cmd in v.cmds:
-        # naive: if command references a known script extension, add edge
-        for ext in SHELL_EXTS:
-            if ext in cmd:
-                # extract last token ending with ext
-                parts = [tok for tok in cmd.split() if tok.endswith(ext)]
-                for p in parts:
-                    edges.append(
-                        Edge(
-                            src=src_path,
-                            dst=p,
-                            kind="call",
-                            command=cmd,
-                            dynamic=False,
-                            resolved=True,
-                            confidence=0.8,
-                        )
+    for _, cmd in _commands(tree):
+        # naive: every token ending with a known script extension is an edge
+        for p in cmd.split():
+            if p.endswith(_SHELL_EXTS):
+                edges.append(
+                    Edge(
+                        src=src_path,
+                        dst=p,
+                        kind="call",
+                        command=cmd,
+                        dynamic=False,
+                        resolved=True,
+                        confidence=0.8,
                     )
+                )
     return edges
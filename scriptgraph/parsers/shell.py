@@ -3,7 +3,7 @@ import re
 from pathlib import Path
 from typing import Iterable
 from ..graph import Edge
-from ..utils import strip_comments
+from ..utils import compile_prefilter, lines_with, strip_comments
 
 # Accept literal paths AND $VAR/ or ${VAR}/ prefixes; allow optional quotes around the path.
 CALL_RE = re.compile(
@@ -41,6 +41,8 @@ CALL_RE = re.compile(
 )
 
 VAR_HINT = re.compile(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?")
+# Every CALL_RE branch ends in one of these extensions; only lines containing one are parsed.
+PREFILTER = compile_prefilter(r"\.(?:sh|bash|ksh|py|pl)")
 
 def _destinations(cmd: str) -> Iterable[str]:
     outs: list[str] = []
@@ -58,7 +60,7 @@ def _destinations(cmd: str) -> Iterable[str]:
 
 def parse_shell(root: Path, src_path: str, text: str):
     edges: list[Edge] = []
-    for raw in text.splitlines():
+    for raw in lines_with(text, PREFILTER):
         line = strip_comments(raw)
         if not line.strip():
             continue
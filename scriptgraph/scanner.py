@@ -1,9 +1,12 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Callable, Dict
+import functools
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from .graph import Graph
-from .utils import is_executable_script, norm_path
+from .utils import MULTI_SLASH_RE, is_executable_script, norm_path
 from .exporter import write_artifacts
 from .parsers import (
     parse_shell,
@@ -24,6 +27,31 @@ PARSERS[".py"] = parse_python_cli
 PARSERS[".pl"] = parse_perl
 
 
+@functools.lru_cache(maxsize=65536)
+def _canon_rel_str(s: str, windows: bool) -> str:
+    s = s.replace("\\", "/")
+    if s.startswith("./"): s = s[2:]
+    if "//" in s: s = MULTI_SLASH_RE.sub("/", s)
+    return s.lower() if windows else s
+
+
+def _iter_scripts(d: str, exts: tuple[str, ...]):
+    """Paths of files under 'd' whose lowercased name ends with one of 'exts', in the same
+    order as Path(d).rglob("*") (a directory's entries first, then its subdirectories;
+    symlinked directories are not descended). One scandir per directory, no per-file stat."""
+    try:
+        with os.scandir(d) as it:
+            entries = list(it)
+    except PermissionError:
+        return
+    for e in entries:
+        if e.name.lower().endswith(exts) and e.is_file():
+            yield e.path
+    for e in entries:
+        if e.is_dir(follow_symlinks=False):
+            yield from _iter_scripts(e.path, exts)
+
+
 class Scanner:
     def __init__(self, include_ext: list[str]):
         self.include_ext = set(e.lower() for e in include_ext)
@@ -36,10 +64,7 @@ class Scanner:
             return False
 
     def _canon_rel_str(self, s: str, windows: bool) -> str:
-        s = (s or "").replace("\\", "/")
-        if s.startswith("./"): s = s[2:]
-        while "//" in s: s = s.replace("//", "/")
-        return s.lower() if windows else s    
+        return _canon_rel_str(s or "", windows)
 
     def scan(self, root_dir: str) -> Graph:
         root = Path(root_dir).resolve()
@@ -47,28 +72,44 @@ class Scanner:
 
         g = Graph()
 
-        for p in root.rglob("*"):
-            if not p.is_file():
-                continue
+        # 1) collect scripts (cheap walk), 2) read + parse them on a thread pool,
+        # 3) merge into the graph on this thread in walk order (same result as a serial scan)
+        files: list[tuple[Path, str]] = []
+        for path in _iter_scripts(str(root), tuple(self.include_ext)):
+            p = Path(path)
             if not is_executable_script(p, self.include_ext):
-                continue
+                continue  # e.g. a dotfile named just ".sh" has no suffix
             rel = p.relative_to(root).as_posix()
-            rel = self._canon_rel_str(rel, windows)
-            g.add_node(rel)
+            files.append((p, self._canon_rel_str(rel, windows)))
+
+        dst_cache: dict[str, str] = {}
+
+        def parse(item: tuple[Path, str]) -> list:
+            p, rel = item
             parser = PARSERS.get(p.suffix.lower())
             if not parser:
-                continue
+                return []
             try:
                 text = p.read_text(encoding="utf-8", errors="ignore")
             except Exception:
-                continue
-            for e in parser(root, rel, text):
+                return []
+            edges = parser(root, rel, text)
+            for e in edges:
                 e.src = self._canon_rel_str(getattr(e, "src", rel), windows)
                 if "$" in e.dst:
                     e.dst = self._canon_rel_str(e.dst, windows)
                 else:
-                    e.dst = self._canon_rel_str(norm_path(root, e.dst), windows)
-                g.add_edge(e)
+                    d = dst_cache.get(e.dst)
+                    if d is None:
+                        # root is already resolved; each distinct target is resolved once per scan
+                        d = dst_cache[e.dst] = self._canon_rel_str(norm_path(root, e.dst, root), windows)
+                    e.dst = d
+            return edges
+
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ex:
+            for (_, rel), edges in zip(files, ex.map(parse, files)):
+                g.add_node(rel)
+                g.add_edges(edges)
 
         return g
 
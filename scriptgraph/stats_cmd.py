@@ -1,11 +1,9 @@
 from __future__ import annotations
 from collections import Counter, defaultdict
 from dataclasses import dataclass, asdict
-from datetime import datetime
 from pathlib import Path
-import json
 import sqlite3
-import yaml
+from .utils import dumps_indented, load_yaml
 
 
 @dataclass
@@ -19,19 +17,29 @@ class GraphStats:
     top_callers: list # list[[src, outdeg]]
     top_callees: list # list[[dst, indeg]]
     def to_json(self) -> str:
-        return json.dumps(asdict(self), indent=2)
+        return dumps_indented(asdict(self))
 
 
 def summarize_graph(graph_yaml: str) -> GraphStats:
-    data = yaml.safe_load(Path(graph_yaml).read_text(encoding="utf-8")) or {}
+    data = load_yaml(graph_yaml)
     nodes = data.get("nodes", [])
     edges = data.get("edges", [])
-    edges_static = sum(1 for e in edges if not e.get("dynamic", False))
-    edges_dynamic_resolved = sum(1 for e in edges if e.get("dynamic", False) and e.get("resolved", False))
-    edges_dynamic_unresolved = sum(1 for e in edges if e.get("dynamic", False) and not e.get("resolved", False))
-    kinds = Counter(e.get("kind", "call") for e in edges)
-    out_deg = Counter(e.get("src") for e in edges)
-    in_deg = Counter(e.get("dst") for e in edges)
+    # one pass over the edges for all counters
+    edges_static = edges_dynamic_resolved = edges_dynamic_unresolved = 0
+    kinds: Counter = Counter()
+    out_deg: Counter = Counter()
+    in_deg: Counter = Counter()
+    for e in edges:
+        get = e.get
+        if not get("dynamic", False):
+            edges_static += 1
+        elif get("resolved", False):
+            edges_dynamic_resolved += 1
+        else:
+            edges_dynamic_unresolved += 1
+        kinds[get("kind", "call")] += 1
+        out_deg[get("src")] += 1
+        in_deg[get("dst")] += 1
     top_callers = [[k, v] for k, v in out_deg.most_common(5)]
     top_callees = [[k, v] for k, v in in_deg.most_common(5)]
     return GraphStats(
@@ -50,34 +58,34 @@ def summarize_graph(graph_yaml: str) -> GraphStats:
 class RunAgg:
     by_cmd: dict # {cmd: {count, mean_sec, p50_sec, p95_sec}}
     def to_json(self) -> str:
-        return json.dumps(self.by_cmd, indent=2)
+        return dumps_indented(self.by_cmd)
+
+_SQL_RUN_DURATIONS = """
+SELECT cmd, dur FROM (
+  SELECT cmd, MAX(0.0, (julianday(finished_at) - julianday(started_at)) * 86400.0) AS dur FROM runs
+) WHERE dur IS NOT NULL
+"""
 
 def summarize_runs(sqlite_path: str) -> RunAgg:
     p = Path(sqlite_path)
     if not p.exists():
         return RunAgg(by_cmd={})
     conn = sqlite3.connect(str(p))
-    cur = conn.execute("SELECT cmd, started_at, finished_at FROM runs")
+    # durations computed by SQLite; unfinished / unparseable rows come back NULL and are skipped
+    cur = conn.execute(_SQL_RUN_DURATIONS)
     buckets: dict[str, list[float]] = defaultdict(list)
-    for cmd, start_s, end_s in cur:
-        if not (start_s and end_s):
-            continue
-        try:
-            start = datetime.fromisoformat(start_s)
-            end = datetime.fromisoformat(end_s)
-            dur = max(0.0, (end - start).total_seconds())
-            buckets[cmd].append(dur)
-        except Exception:
-            continue
+    for cmd, dur in cur:
+        buckets[cmd].append(dur)
     conn.close()
     def pct(xs: list[float], p: float) -> float:
+        # nearest-rank on an already sorted list
         if not xs: return 0.0
-        xs = sorted(xs)
         i = int(round((p / 100.0) * (len(xs) - 1)))
         return xs[i]
     out: dict[str, dict] = {}
     for cmd, xs in buckets.items():
         if not xs: continue
+        xs.sort()  # once per command, shared by both percentiles
         mean = sum(xs) / len(xs)
         out[cmd] = {"count": len(xs), "mean_sec": round(mean, 3),
                     "p50_sec": round(pct(xs, 50), 3),
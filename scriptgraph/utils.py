@@ -1,10 +1,32 @@
 from __future__ import annotations
+import functools
+import json
 import re
 import socket
 from pathlib import Path
+from typing import Any, Iterator
+
+import yaml
+
+# Optional RE2 (google-re2 / pyre2): linear-time DFA matching for the parsers' literal prefilters
+try:
+    import re2 as _re2  # type: ignore
+except Exception:  # pragma: no cover
+    _re2 = None
+try:
+    from yaml import CSafeLoader as _SafeLoader  # libyaml-backed, much faster on large graphs
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as _SafeLoader
+try:
+    import orjson  # optional, fast path for graphs written as JSON
+except Exception:  # pragma: no cover
+    orjson = None
 
 # Strip whole-line comments starting with '#' or '//' (kept simple for MVP).
 COMMENT_RE = re.compile(r"^\s*(#|//).*")
+# Line boundaries as str.splitlines() sees them; the second set is rare in scripts.
+_LINE_BREAK = re.compile(r"[\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+_RARE_BREAK = re.compile(r"[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
 
 
 class BlockAllSockets(socket.socket):
@@ -19,13 +41,14 @@ def disable_network():
     socket.socket = BlockAllSockets  # type: ignore[attr-defined]
 
 
-def norm_path(root: Path, p: str) -> str:
+def norm_path(root: Path, p: str, root_resolved: Path | None = None) -> str:
+    # pass root_resolved when calling in a loop to skip re-resolving root every time
     try:
         cand = (root / p).resolve()
     except Exception:
         cand = (root / p)
     try:
-        out = str(cand.relative_to(root.resolve()))
+        out = str(cand.relative_to(root_resolved if root_resolved is not None else root.resolve()))
     except Exception:
         out = str(cand)
     return out.replace("\\", "/")  # <— normalize on Windows
@@ -36,14 +59,74 @@ def is_executable_script(path: Path, include_ext: set[str]) -> bool:
 
 
 def strip_comments(line: str) -> str:
-    return COMMENT_RE.sub("", line)
+    # same result as COMMENT_RE.sub("", line) for a single line, without the regex call
+    return "" if line.lstrip().startswith(("#", "//")) else line
+
+def compile_prefilter(pattern: str):
+    """Compile a plain literal alternation (inline flags only) with RE2 when installed, else `re`.
+    Only used for prefilters, whose match sets are identical under both engines."""
+    if _re2 is not None:
+        try:
+            return _re2.compile(pattern)
+        except Exception:
+            pass
+    return re.compile(pattern)
+
+def lines_with(text: str, pattern: re.Pattern) -> Iterator[str]:
+    """The lines of 'text' (split like str.splitlines()) that contain a 'pattern' match, in order.
+    Scans the whole buffer once instead of materializing every line."""
+    if _RARE_BREAK.search(text):
+        yield from (ln for ln in text.splitlines() if pattern.search(ln))
+        return
+    end = -1
+    for m in pattern.finditer(text):
+        i = m.start()
+        if i < end:
+            continue  # another hit on the line already yielded
+        start = max(text.rfind("\n", 0, i), text.rfind("\r", 0, i)) + 1
+        nb = _LINE_BREAK.search(text, m.end())
+        end = nb.start() if nb else len(text)
+        yield text[start:end]
+
+_LEADING_DOTSLASH_RE = re.compile(r"^\./")
+MULTI_SLASH_RE = re.compile(r"/{2,}")
 
 def canon(p: str) -> str:
     if not isinstance(p, str):
         return p
+    return _canon_str(p)
+
+# Graphs repeat the same src/dst strings across edges; normalize each distinct one once.
+@functools.lru_cache(maxsize=65536)
+def _canon_str(p: str) -> str:
     p = p.replace("\\", "/")
-    p = re.sub(r"^\./", "", p)      # drop leading ./ once
+    p = _LEADING_DOTSLASH_RE.sub("", p)  # drop leading ./ once
     p = p.replace("/./", "/")       # collapse /./
-    while "//" in p:
-        p = p.replace("//", "/")    # collapse //
+    if "//" in p:
+        p = MULTI_SLASH_RE.sub("/", p)  # collapse // runs in one pass
     return p
+
+
+def dumps_indented(obj: Any) -> str:
+    """json.dumps(obj, indent=2), encoded by orjson when available. Falls back to json for
+    values orjson rejects and for non-ASCII output (keeps json's \\u escapes for consoles)."""
+    if orjson is not None:
+        try:
+            out = orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+            if out.isascii():
+                return out
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2)
+
+
+def load_yaml(path: str) -> dict[str, Any]:
+    """Parse a YAML (or JSON) graph file; {} for an empty document."""
+    data = Path(path).read_bytes()
+    # JSON is valid YAML: try the (much faster) JSON parser first when the file looks like JSON
+    if orjson is not None and data.lstrip().startswith(b"{"):
+        try:
+            return orjson.loads(data) or {}
+        except orjson.JSONDecodeError:
+            pass
+    return yaml.load(data, Loader=_SafeLoader) or {}
@@ -1,4 +1,4 @@
-import json, sys, statistics as st
+import json, math, sys
 from collections import defaultdict
 
 """
@@ -6,54 +6,60 @@ Usage:
   py -3 tools/bench_aggregate.py artifacts/bench_results.jsonl
 """
 
-def mean(xs): return 0.0 if not xs else st.mean(xs)
+try:
+    import orjson  # optional, faster JSONL parsing
+except ImportError:
+    orjson = None
+
+def _loads(s):
+    # orjson when available; json for what it rejects (NaN/Infinity, >64-bit ints)
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+_TIERS = {"easy-": "easy", "hard-": "hard"}   # bundle name prefix -> tier
+
+def mean(xs): return 0.0 if not xs else math.fsum(xs) / len(xs)
+
+def _cols():
+    return ([], [], [], [])   # node-F1, edge-F1, GCR, total-ms (latency only when present)
 
 def main(path):
-    rows = []
+    by_role = defaultdict(_cols)
+    by_tier_role = defaultdict(_cols)   # (tier, role) -> columns
+    tier_cache = {}
+    def tier_of(b):
+        # bundles repeat once per system: classify each name once
+        t = tier_cache.get(b)
+        if t is None:
+            t = tier_cache[b] = _TIERS.get(str(b)[:5].lower(), "unknown")
+        return t
+    # one streaming pass: parse each line and append its values straight into both groupings
     with open(path, "r", encoding="utf-8") as f:
         for line in f:
             if not line.strip(): continue
-            rows.append(json.loads(line))
-    by_role = defaultdict(list)
-    by_tier_role = defaultdict(list)   # (tier, role) -> list
-    def tier_of(b):
-        s = str(b).lower()
-        return "easy" if s.startswith("easy-") else ("hard" if s.startswith("hard-") else "unknown")
-    for r in rows:
-        role = r.get("role") or "unknown"
-        bundle = r.get("bundle") or ""
-        sc = r.get("score") or {}
-        lat = r.get("latency") or {}
-        by_role[role].append((
-            sc.get("f1_nodes", 0.0),
-            sc.get("f1_edges", 0.0),
-            sc.get("gcr", 0),
-            lat.get("total", None),
-        ))
-        by_tier_role[(tier_of(bundle), role)].append((
-            sc.get("f1_nodes", 0.0),
-            sc.get("f1_edges", 0.0),
-            sc.get("gcr", 0),
-            lat.get("total", None),
-        ))
+            r = _loads(line)
+            role = r.get("role") or "unknown"
+            bundle = r.get("bundle") or ""
+            sc = r.get("score") or {}
+            lat = r.get("latency") or {}
+            vals = (sc.get("f1_nodes", 0.0), sc.get("f1_edges", 0.0), sc.get("gcr", 0), lat.get("total", None))
+            for cols in (by_role[role], by_tier_role[(tier_of(bundle), role)]):
+                cols[0].append(vals[0]); cols[1].append(vals[1]); cols[2].append(vals[2])
+                if vals[3] is not None: cols[3].append(vals[3])
     print("role\tN\tNode-F1\tEdge-F1\tGCR\tTotal-ms")
-    for role, items in by_role.items():
-        n = len(items)
-        nF1 = mean([a for a,_,_,_ in items])
-        eF1 = mean([b for _,b,_,_ in items])
-        gcr = mean([c for *_,c,_ in items])
-        tms = mean([d for *__,d in items if d is not None])
-        print(f"{role}\t{n}\t{nF1:.3f}\t{eF1:.3f}\t{gcr:.3f}\t{(tms if tms else 0):.1f}")
+    for role, (nf, ef, gc, tm) in by_role.items():
+        tms = mean(tm)
+        print(f"{role}\t{len(nf)}\t{mean(nf):.3f}\t{mean(ef):.3f}\t{mean(gc):.3f}\t{(tms if tms else 0):.1f}")
 
     print("\n# by-tier")
     print("tier\trole\tN\tNode-F1\tEdge-F1\tGCR\tTotal-ms")
-    for (tier, role), items in sorted(by_tier_role.items()):
-        n = len(items)
-        nF1 = mean([a for a,_,_,_ in items])
-        eF1 = mean([b for _,b,_,_ in items])
-        gcr = mean([c for *_,c,_ in items])
-        tms = mean([d for *__,d in items if d is not None])
-        print(f"{tier}\t{role}\t{n}\t{nF1:.3f}\t{eF1:.3f}\t{gcr:.3f}\t{(tms if tms else 0):.1f}")
+    for (tier, role), (nf, ef, gc, tm) in sorted(by_tier_role.items()):
+        tms = mean(tm)
+        print(f"{tier}\t{role}\t{len(nf)}\t{mean(nf):.3f}\t{mean(ef):.3f}\t{mean(gc):.3f}\t{(tms if tms else 0):.1f}")
 
 if __name__ == "__main__":
     p = sys.argv[1] if len(sys.argv) > 1 else "artifacts/bench_results.jsonl"
@@ -9,17 +9,32 @@ import sys
 from collections import defaultdict
 from itertools import combinations
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
 import numpy as np
 import pandas as pd
 from scipy import stats
 
+try:
+    import orjson  # optional, faster JSONL parsing
+except ImportError:
+    orjson = None
+
 
 # ----------------------------- IO ---------------------------------
 
-def _load_jsonl(path: str) -> List[dict]:
-    rows = []
+def _loads(s: str):
+    # orjson when available; json for what it rejects (NaN/Infinity, >64-bit ints)
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+
+def _iter_jsonl(path: str) -> Iterator[dict]:
+    """Yield the JSON rows of a results file one at a time (no full list in memory)."""
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         for line in f:
             s = line.strip()
@@ -34,28 +49,31 @@ def _load_jsonl(path: str) -> List[dict]:
                     continue
                 s = s[i:]
             try:
-                obj = json.loads(s)
-                rows.append(obj)
+                obj = _loads(s)
             except Exception:
                 # Not a JSON object; skip
                 continue
-    return rows
+            yield obj
 
 
 # ----------------------------- Stats helpers ---------------------------------
+# The helpers taking 'd' expect paired differences with NaNs already removed
+# (analyze() drops them once per pair).
 
 def _paired_t(y: np.ndarray, x: np.ndarray) -> Tuple[float, float]:
     # returns t-statistic and two-sided p-value
     if len(y) < 2:
         return (float("nan"), float("nan"))
+    if np.array_equal(y, x):
+        # all differences zero (common for 0/1 metrics like gcr): t is 0/0, which is
+        # what ttest_rel reports as (nan, nan); skip the scipy call
+        return (float("nan"), float("nan"))
     t, p = stats.ttest_rel(y, x, nan_policy="omit")
     return (float(t), float(p))
 
 
-def _wilcoxon_signed(y: np.ndarray, x: np.ndarray) -> Tuple[float, float]:
+def _wilcoxon_signed(d: np.ndarray) -> Tuple[float, float]:
     # SciPy's wilcoxon fails when all diffs are zero; handle gracefully.
-    d = y - x
-    d = d[~np.isnan(d)]
     if len(d) == 0 or np.allclose(d, 0.0):
         return (0.0, 1.0)
     # 'pratt' includes zeros in ranking but not in W; robust default
@@ -68,7 +86,6 @@ def _wilcoxon_signed(y: np.ndarray, x: np.ndarray) -> Tuple[float, float]:
 
 def _cohen_dz(d: np.ndarray) -> float:
     # Cohen's d for paired samples: mean(diff) / sd(diff)
-    d = d[~np.isnan(d)]
     if len(d) < 2:
         return float("nan")
     sd = np.std(d, ddof=1)
@@ -82,7 +99,6 @@ def _rank_biserial(d: np.ndarray) -> Tuple[float, float]:
     Also return win-rate = n_pos / (n_pos + n_neg).
     Zeros (ties) are ignored in denominator.
     """
-    d = d[~np.isnan(d)]
     if d.size == 0:
         return float("nan"), float("nan")
     n_pos = int(np.sum(d > 0))
@@ -95,16 +111,39 @@ def _rank_biserial(d: np.ndarray) -> Tuple[float, float]:
     return float(r_rb), float(win_rate)
 
 
-def _bootstrap_ci_mean(d: np.ndarray, n_boot: int = 10000, seed: int = 0, alpha: float = 0.05) -> Tuple[float, float]:
-    d = d[~np.isnan(d)]
-    if len(d) == 0:
-        return (float("nan"), float("nan"))
-    rng = np.random.default_rng(seed)
-    idx = rng.integers(0, len(d), size=(n_boot, len(d)))
-    boots = np.mean(d[idx], axis=1)
-    lo = float(np.percentile(boots, 100 * (alpha / 2)))
-    hi = float(np.percentile(boots, 100 * (1 - alpha / 2)))
-    return (lo, hi)
+_BOOT_CHUNK = 2048  # resample rows gathered per step
+
+
+def _resample_means(d: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    """np.mean(d[idx], axis=1), gathering _BOOT_CHUNK rows at a time so the
+    temporary stays small instead of a full (n_boot, n) float copy."""
+    out = np.empty(len(idx))
+    for s in range(0, len(idx), _BOOT_CHUNK):
+        out[s:s + _BOOT_CHUNK] = np.mean(d[idx[s:s + _BOOT_CHUNK]], axis=1)
+    return out
+
+
+def _bootstrap_ci_means(ds: List[np.ndarray], n_boot: int = 10000, seed: int = 0, alpha: float = 0.05) -> List[Tuple[float, float]]:
+    """
+    Percentile bootstrap CI of the mean for each array in ds.
+    A fresh default_rng(seed) draw depends only on the sample size, so the
+    (n_boot, n) resample index matrix is drawn once per distinct n and shared
+    by every array of that size (same CIs as bootstrapping each one separately).
+    """
+    out: List[Tuple[float, float]] = [(float("nan"), float("nan"))] * len(ds)
+    by_n: Dict[int, List[int]] = defaultdict(list)
+    for i, d in enumerate(ds):
+        if len(d):
+            by_n[len(d)].append(i)
+    q = [100 * (alpha / 2), 100 * (1 - alpha / 2)]
+    for n, members in by_n.items():
+        idx = np.random.default_rng(seed).integers(0, n, size=(n_boot, n))
+        for i in members:
+            boots = _resample_means(ds[i], idx)
+            # both bounds from one partition, done in place on the throwaway buffer
+            lo, hi = np.percentile(boots, q, overwrite_input=True)
+            out[i] = (float(lo), float(hi))
+    return out
 
 
 def _holm_bonferroni(pvals: List[Tuple[str, float]]) -> Dict[str, float]:
@@ -112,36 +151,45 @@ def _holm_bonferroni(pvals: List[Tuple[str, float]]) -> Dict[str, float]:
     Holm-Bonferroni step-down adjustment.
     pvals: list of (key, p)
     returns dict key -> p_adj
+    Adjusted p for the i-th smallest p is max over j <= i of min(1, (m - j + 1) * p_(j)),
+    so adjusted values are monotone in the raw p-values. NaN/None p-values map to NaN.
     """
-    # Filter NaNs
     valid = [(k, p) for k, p in pvals if (p is not None and not math.isnan(p))]
     m = len(valid)
     if m == 0:
         return {k: float("nan") for k, _ in pvals}
-    # sort ascending by p
-    sorted_idx = sorted(range(m), key=lambda i: valid[i][1])
-    adj = {}
-    min_so_far = 1.0
-    for rank, i in enumerate(sorted_idx, start=1):
-        k, p = valid[i]
-        padj = (m - rank + 1) * p
-        padj = min(1.0, padj)
-        # ensure monotonicity
-        min_so_far = max(min_so_far, padj) if rank == 1 else max(min_so_far, padj)
-        adj[k] = padj
-    # put back NaNs for invalid
-    out = {k: adj.get(k, float("nan")) for k, _ in pvals}
-    return out
+    p = np.array([p for _, p in valid], dtype=np.float64)
+    order = np.argsort(p, kind="stable")
+    adj_sorted = np.minimum(1.0, np.maximum.accumulate((m - np.arange(m)) * p[order]))
+    adj = np.empty(m)
+    adj[order] = adj_sorted
+    adj_map = {k: float(a) for (k, _), a in zip(valid, adj)}
+    return {k: adj_map.get(k, float("nan")) for k, _ in pvals}
 
 
 # ----------------------------- Core analysis ---------------------------------
 
+def _pivot_first(df: pd.DataFrame, metric_key: str) -> pd.DataFrame:
+    """
+    bundles x roles table of the first non-NaN metric value per (bundle, role);
+    same result as df.pivot_table(index="bundle", columns="role", values=metric_key,
+    aggfunc="first"), built by scattering into a NaN matrix via integer codes.
+    """
+    sub = df[["bundle", "role", metric_key]].dropna(subset=[metric_key])
+    sub = sub.drop_duplicates(subset=["bundle", "role"], keep="first")
+    b_codes, bundles = pd.factorize(sub["bundle"], sort=True)
+    r_codes, roles = pd.factorize(sub["role"], sort=True)
+    M = np.full((len(bundles), len(roles)), np.nan)
+    M[b_codes, r_codes] = sub[metric_key].to_numpy(dtype=np.float64)
+    return pd.DataFrame(M, index=pd.Index(bundles, name="bundle"), columns=pd.Index(roles, name="role"))
+
+
 def analyze(df: pd.DataFrame, metric_key: str, alpha: float, n_boot: int, seed: int, systems: List[str] | None) -> str:
     """
     df columns: bundle, role, score.<metric_key>
     """
     # Pivot: bundles x roles
-    pivot = df.pivot_table(index="bundle", columns="role", values=metric_key, aggfunc="first")
+    pivot = _pivot_first(df, metric_key)
     roles = list(pivot.columns) if not systems else [r for r in systems if r in pivot.columns]
     if len(roles) < 2:
         return "Not enough systems to compare.\n"
@@ -192,32 +240,46 @@ def analyze(df: pd.DataFrame, metric_key: str, alpha: float, n_boot: int, seed:
     pvals_t_keys: List[Tuple[str, float]] = []
     pvals_w_keys: List[Tuple[str, float]] = []
 
+    # Materialize bundles x roles once; each pair then only slices the dense matrix
+    M = pivot[roles].to_numpy(dtype=np.float64)
+    present = ~np.isnan(M)
+    col = {r: i for i, r in enumerate(roles)}
+
     pair_rows = []
+    diffs: List[Tuple[int, np.ndarray]] = []  # (pair_rows index, paired differences)
     for a, b in combinations(roles, 2):
+        ia, ib = col[a], col[b]
         # matched bundles
-        sub = pivot[[a, b]].dropna()
-        n = len(sub)
+        both = present[:, ia] & present[:, ib]
+        n = int(np.count_nonzero(both))
         if n < 2:
             row = (a, b, n, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, ("nan", "nan"))
             pair_rows.append(row)
             continue
-        x = sub[a].to_numpy()
-        y = sub[b].to_numpy()
+        x = M[both, ia]
+        y = M[both, ib]
         d = y - x
+        # x, y are matched non-NaN values, but inf - inf can still give NaN: drop once here
+        nan_d = np.isnan(d)
+        d_clean = d[~nan_d] if nan_d.any() else d
 
         mean_diff = float(np.mean(d))
         t, p_t = _paired_t(y, x)
-        w, p_w = _wilcoxon_signed(y, x)
-        dz = _cohen_dz(d)
-        r_rb, win_rate = _rank_biserial(d)
-        lo, hi = _bootstrap_ci_mean(d, n_boot=n_boot, seed=seed, alpha=alpha)
-
+        w, p_w = _wilcoxon_signed(d_clean)
+        dz = _cohen_dz(d_clean)
+        r_rb, win_rate = _rank_biserial(d_clean)
         key_t = f"{a}__{b}__t"
         key_w = f"{a}__{b}__w"
         pvals_t_keys.append((key_t, p_t))
         pvals_w_keys.append((key_w, p_w))
 
-        pair_rows.append((a, b, n, mean_diff, t, p_t, w, p_w, key_t, key_w, dz, r_rb, win_rate, (lo, hi)))
+        pair_rows.append((a, b, n, mean_diff, t, p_t, w, p_w, key_t, key_w, dz, r_rb, win_rate, None))
+        diffs.append((len(pair_rows) - 1, d_clean))
+
+    # Bootstrap CIs for all pairs at once (one resample draw per distinct pair size)
+    cis = _bootstrap_ci_means([d for _, d in diffs], n_boot=n_boot, seed=seed, alpha=alpha)
+    for (j, _), ci in zip(diffs, cis):
+        pair_rows[j] = pair_rows[j][:-1] + (ci,)
 
     # Adjust with Holm separately for t and Wilcoxon families
     p_t_adj_map = _holm_bonferroni(pvals_t_keys)
@@ -262,7 +324,7 @@ def _tier_from_bundle(name: str) -> str:
 
 def _make_tidy(df: pd.DataFrame, metric_key: str) -> pd.DataFrame:
     t = df[["bundle", "role", metric_key]].copy()
-    t["tier"] = t["bundle"].apply(_tier_from_bundle)
+    t["tier"] = t["bundle"].map(_tier_from_bundle)   # once per category, not per row
     return t
 
 def _performance_profile(tidy: pd.DataFrame, metric_key: str, roles: List[str], step: float = 0.05) -> pd.DataFrame:
@@ -278,7 +340,7 @@ def _performance_profile(tidy: pd.DataFrame, metric_key: str, roles: List[str],
 
 def _deltas(df: pd.DataFrame, metric_key: str, pairs: List[str]) -> pd.DataFrame:
     """Return per-bundle deltas for pairs like ['static:2R','static:4R']."""
-    pivot = df.pivot_table(index="bundle", columns="role", values=metric_key, aggfunc="first")
+    pivot = _pivot_first(df, metric_key)
     out_rows = []
     for pair in pairs:
         if ":" not in pair: 
@@ -294,6 +356,15 @@ def _deltas(df: pd.DataFrame, metric_key: str, pairs: List[str]) -> pd.DataFrame
 
 # ----------------------------- CLI ---------------------------------
 
+# latency block key -> flattened column (column order is the --lat-csv order)
+_LAT_COLUMNS = (
+    ("total", "lat_total_ms"),
+    ("Reader", "lat_reader_ms"),
+    ("Mapper", "lat_mapper_ms"),
+    ("Writer", "lat_writer_ms"),
+    ("Planner", "lat_planner_ms"),
+)
+
 def main():
     ap = argparse.ArgumentParser(description="Statistical comparisons of systems over bundles (paired tests) + export tidy CSVs.")
     ap.add_argument("jsonl", help="Path to artifacts/bench_results.jsonl")
@@ -313,13 +384,11 @@ def main():
     ap.add_argument("--lat-csv", help="If latency columns exist, write CSV with bundle,role,lat_* columns.")
     args = ap.parse_args()
 
-    rows = _load_jsonl(args.jsonl)
-    if not rows:
-        sys.exit("No JSON rows found in input.")
-
-    # Flatten to DataFrame
+    # Single streaming pass: parse and flatten each row as it is read
+    n_rows = 0
     recs = []
-    for r in rows:
+    for r in _iter_jsonl(args.jsonl):
+        n_rows += 1
         bundle = r.get("bundle")
         role = r.get("role")
         sc = r.get("score", {}) or {}
@@ -338,16 +407,19 @@ def main():
 
         lat = r.get("latency") or {}
         if isinstance(lat, dict):
-            rec["lat_total_ms"]   = float(lat.get("total")) if lat.get("total") is not None else np.nan
-            rec["lat_reader_ms"]  = float(lat.get("Reader")) if lat.get("Reader") is not None else np.nan
-            rec["lat_mapper_ms"]  = float(lat.get("Mapper")) if lat.get("Mapper") is not None else np.nan
-            rec["lat_writer_ms"]  = float(lat.get("Writer")) if lat.get("Writer") is not None else np.nan
-            rec["lat_planner_ms"] = float(lat.get("Planner")) if lat.get("Planner") is not None else np.nan
+            for key, col in _LAT_COLUMNS:
+                v = lat.get(key)
+                rec[col] = float(v) if v is not None else np.nan
 
+    if not n_rows:
+        sys.exit("No JSON rows found in input.")
     if not recs:
         sys.exit("No usable records found (missing bundle/role/score).")
 
     df_all = pd.DataFrame.from_records(recs)
+    # few distinct bundles/roles repeated across many rows: keep them as integer codes
+    df_all["bundle"] = df_all["bundle"].astype("category")
+    df_all["role"] = df_all["role"].astype("category")
     metric_key = args.metric
     if metric_key not in df_all.columns:
         # allow synonyms
@@ -359,7 +431,7 @@ def main():
             sys.exit(f"Metric '{args.metric}' not found. Available: {avail}")
 
     # Optional CSV of the wide table (for your appendix)
-    pivot = df_all.pivot_table(index="bundle", columns="role", values=metric_key, aggfunc="first")
+    pivot = _pivot_first(df_all, metric_key)
     pivot = pivot.sort_index()
     if args.csv:
         Path(args.csv).parent.mkdir(parents=True, exist_ok=True)
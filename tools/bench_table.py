@@ -1,5 +1,22 @@
 import sys, json, statistics
 
+try:
+    import orjson  # optional, faster JSONL parsing
+except ImportError:
+    orjson = None
+
+def _loads(s):
+    # orjson when available; json for what it rejects (NaN/Infinity, >64-bit ints)
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+_LAT_KEYS = ("total", "Planner", "Reader", "Mapper", "Writer")   # latency block keys kept per row
+_TIERS = {"easy-": "easy", "hard-": "hard"}   # bundle name prefix -> tier
+
 def _mean(xs):
     xs = [x for x in xs if x is not None]
     return 0.0 if not xs else sum(xs)/len(xs)
@@ -17,7 +34,7 @@ def main(path: str):
                     continue
                 s = s[i:]
             try:
-                rows.append(json.loads(s))
+                rows.append(_loads(s))
             except Exception:
                 continue
 
@@ -25,80 +42,76 @@ def main(path: str):
     by_bundle_role = {}   # bundle -> role -> score dict
     tiers = {}            # bundle -> tier
     def _tier(b):
-        b = str(b).lower()
-        return "easy" if b.startswith("easy-") else ("hard" if b.startswith("hard-") else "unknown")
+        return _TIERS.get(str(b)[:5].lower(), "unknown")
 
     for r in rows:
         role = r.get("role","")
         bundle = r.get("bundle","")
-        tiers[bundle] = _tier(bundle)
+        if bundle not in tiers:   # bundles repeat once per system
+            tiers[bundle] = _tier(bundle)
         sc   = r.get("score",{}) or {}
         lat  = r.get("latency",{}) or {}
         by_role.setdefault(role, {"scores": [], "lat": []})
         by_role[role]["scores"].append(sc)
         if lat:
             # normalize expected keys; missing -> None
-            by_role[role]["lat"].append({
-                "total":   lat.get("total"),
-                "Planner": lat.get("Planner"),
-                "Reader":  lat.get("Reader"),
-                "Mapper":  lat.get("Mapper"),
-                "Writer":  lat.get("Writer"),
-            })
+            by_role[role]["lat"].append({k: lat.get(k) for k in _LAT_KEYS})
         # for win-rate computations
         by_bundle_role.setdefault(bundle, {})[role] = sc
 
+    # Collect the report and write it once at the end
+    out = []
+    emit = out.append
+
     # Quality
-    print("| System | N | Node F1 | Edge F1 | GCR |")
-    print("|:--|--:|--:|--:|--:|")
+    emit("| System | N | Node F1 | Edge F1 | GCR |")
+    emit("|:--|--:|--:|--:|--:|")
     for role, grp in sorted(by_role.items()):
         arr = grp["scores"]
         n   = len(arr)
         nf  = _mean([x.get("f1_nodes") for x in arr])
         ef  = _mean([x.get("f1_edges") for x in arr])
         gcr = _mean([x.get("gcr")      for x in arr])
-        print(f"| {role} | {n} | {nf:.3f} | {ef:.3f} | {gcr:.3f} |")
+        emit(f"| {role} | {n} | {nf:.3f} | {ef:.3f} | {gcr:.3f} |")
 
     # Latency (if present)
     any_lat = any(grp["lat"] for grp in by_role.values())
     if any_lat:
-        print("\n| System | N | mean total (ms) | mean Planner | mean Reader | mean Mapper | mean Writer |")
-        print("|:--|--:|--:|--:|--:|--:|--:|")
+        emit("\n| System | N | mean total (ms) | mean Planner | mean Reader | mean Mapper | mean Writer |")
+        emit("|:--|--:|--:|--:|--:|--:|--:|")
         for role, grp in sorted(by_role.items()):
             lat = grp["lat"]
             if not lat:
-                print(f"| {role} | 0 |  |  |  |  |  |")
+                emit(f"| {role} | 0 |  |  |  |  |  |")
                 continue
             n   = len(lat)
             m   = lambda k: _mean([e.get(k) for e in lat])
-            print(f"| {role} | {n} | {m('total'):.1f} | {m('Planner'):.1f} | {m('Reader'):.1f} | {m('Mapper'):.1f} | {m('Writer'):.1f} |")
+            emit(f"| {role} | {n} | {m('total'):.1f} | {m('Planner'):.1f} | {m('Reader'):.1f} | {m('Mapper'):.1f} | {m('Writer'):.1f} |")
 
     # --- By-tier summaries (Edge F1 & GCR) ---
-    print("\n## By-tier summary (Edge F1 and GCR)")
-    print("| Tier | System | N | mean Edge F1 | mean GCR |")
-    print("|:--|:--|--:|--:|--:|")
+    emit("\n## By-tier summary (Edge F1 and GCR)")
+    emit("| Tier | System | N | mean Edge F1 | mean GCR |")
+    emit("|:--|:--|--:|--:|--:|")
     roles = sorted(by_role.keys())
+    # one pass over bundles groups (tier, role) -> (edge F1s, GCRs), in bundle order
+    by_tier_role = {}
+    for b, sysmap in by_bundle_role.items():
+        tier = tiers.get(b)
+        for role, sc in sysmap.items():
+            vals, gcrs = by_tier_role.setdefault((tier, role), ([], []))
+            vals.append(sc.get("f1_edges"))
+            gcrs.append(sc.get("gcr"))
     for tier in ("easy", "hard"):
         for role in roles:
-            vals = []
-            gcrs = []
-            n = 0
-            for b, sysmap in by_bundle_role.items():
-                if tiers.get(b) != tier: 
-                    continue
-                sc = sysmap.get(role)
-                if sc is None: 
-                    continue
-                vals.append(sc.get("f1_edges"))
-                gcrs.append(sc.get("gcr"))
-                n += 1
-            if n > 0:
-                print(f"| {tier} | {role} | {n} | {_mean(vals):.3f} | {_mean(gcrs):.3f} |")
+            grp = by_tier_role.get((tier, role))
+            if grp:
+                vals, gcrs = grp
+                emit(f"| {tier} | {role} | {len(vals)} | {_mean(vals):.3f} | {_mean(gcrs):.3f} |")
 
     # --- Win-rates vs static on Edge F1 & GCR (ties excluded) ---
-    print("\n## Win-rates vs static (ties excluded)")
-    print("| Tier | B vs A | N | win_rate(B>A) on Edge F1 | win_rate(B>A) on GCR |")
-    print("|:--|:--|--:|--:|--:|")
+    emit("\n## Win-rates vs static (ties excluded)")
+    emit("| Tier | B vs A | N | win_rate(B>A) on Edge F1 | win_rate(B>A) on GCR |")
+    emit("|:--|:--|--:|--:|--:|")
     for tier in ("easy", "hard"):
         for b in ("2R", "4R"):
             n_e = n_g = 0
@@ -122,7 +135,9 @@ def main(path: str):
                     if gb > ga: w_g += 1
             wr_e = (w_e / n_e) if n_e else 0.0
             wr_g = (w_g / n_g) if n_g else 0.0
-            print(f"| {tier} | {b} vs static | {n_e} | {wr_e:.3f} | {wr_g:.3f} |")
+            emit(f"| {tier} | {b} vs static | {n_e} | {wr_e:.3f} | {wr_g:.3f} |")
+
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 if __name__=="__main__":
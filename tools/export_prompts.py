@@ -1,5 +1,18 @@
 import sqlite3, json, sys, os
 
+try:
+    import orjson  # optional, faster JSONL encoding
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _dumps = orjson.dumps
+else:
+    # same compact bytes orjson produces, so output doesn't depend on what's installed
+    _encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    def _dumps(obj):
+        return _encode(obj).encode("utf-8")
+
 """
 Usage:
   py -3 tools/export_prompts.py out/runlog.sqlite out/prompts.jsonl [out/llm_stats.json]
@@ -13,15 +26,21 @@ out_prompts = sys.argv[2] if len(sys.argv) > 2 else "./out/prompts.jsonl"
 out_stats = sys.argv[3] if len(sys.argv) > 3 else None
 os.makedirs(os.path.dirname(out_prompts), exist_ok=True)
 
-conn = sqlite3.connect(db)
-conn.row_factory = sqlite3.Row
+conn = sqlite3.connect(db)   # plain tuple rows: no per-row sqlite3.Row wrapper
 
-# 1) dump prompts
+# 1) dump prompts as UTF-8 bytes, one write per fetched batch
 cur = conn.execute("SELECT role, prompt FROM llm_prompts ORDER BY id ASC")
-with open(out_prompts, "w", encoding="utf-8") as f:
-    for row in cur:
-        role = row["role"]; prompt = row["prompt"]
-        f.write(json.dumps({"role": role, "prompt": prompt}, ensure_ascii=False) + "\n")
+with open(out_prompts, "wb", buffering=1 << 20) as f:
+    buf = bytearray()
+    while True:
+        batch = cur.fetchmany(4096)
+        if not batch:
+            break
+        for role, prompt in batch:
+            buf += _dumps({"role": role, "prompt": prompt})
+            buf += b"\n"
+        f.write(buf)
+        buf.clear()
 print(f"Wrote {out_prompts}")
 
 # 2) optional aggregate stats
@@ -48,32 +67,28 @@ if out_stats:
     try:
         cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='llm_calls'")
         if cur.fetchone():
+            # per-role count and means computed by SQLite: one row per role, in first-seen order
             cur2 = conn.execute("""
-                SELECT role, 
-                       COALESCE(input_tokens,0) AS in_tok, 
-                       COALESCE(completion_tokens,0) AS out_tok,
-                       COALESCE(total_tokens,0) AS tot_tok,
-                       COALESCE(latency_ms,0.0) AS lat_ms
+                SELECT role,
+                       COUNT(*) AS calls,
+                       AVG(COALESCE(input_tokens,0)) AS in_tok,
+                       AVG(COALESCE(output_tokens,0)) AS out_tok,
+                       AVG(COALESCE(total_tokens,0)) AS tot_tok,
+                       AVG(COALESCE(latency_ms,0.0)) AS lat_ms
                 FROM llm_calls
+                GROUP BY role
+                ORDER BY MIN(rowid)
             """)
-            agg = {}
-            for row in cur2.fetchall():
-                r = row["role"]
-                agg.setdefault(r, {"in":[], "out":[], "tot":[], "lat":[]})
-                agg[r]["in"].append(float(row["in_tok"]))
-                agg[r]["out"].append(float(row["out_tok"]))
-                agg[r]["tot"].append(float(row["tot_tok"]))
-                agg[r]["lat"].append(float(row["lat_ms"]))
-            for r, d in agg.items():
-                def _m(xs): return float(sum(xs)/len(xs)) if xs else 0.0
+            for r, calls, in_tok, out_tok, tot_tok, lat_ms in cur2.fetchall():
                 xs = stats.setdefault(r, {})
-                xs["calls"] = len(d["tot"])
-                xs["mean_prompt_tokens"] = _m(d["in"])
-                xs["mean_completion_tokens"] = _m(d["out"])
-                xs["mean_total_tokens"] = _m(d["tot"])
-                xs["mean_latency_ms"] = _m(d["lat"])
-    except Exception:
-        pass
+                xs["calls"] = calls
+                xs["mean_prompt_tokens"] = float(in_tok)
+                xs["mean_completion_tokens"] = float(out_tok)
+                xs["mean_total_tokens"] = float(tot_tok)
+                xs["mean_latency_ms"] = float(lat_ms)
+    except sqlite3.Error as e:
+        # don't hide a schema mismatch: the per-role call stats would silently go missing
+        print(f"Skipped llm_calls stats: {e}", file=sys.stderr)
 
     os.makedirs(os.path.dirname(out_stats), exist_ok=True)
     with open(out_stats, "w", encoding="utf-8") as f:
@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
-import argparse, random, textwrap, json, hashlib
+import argparse, random, json, hashlib, os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 KINDS = ("easy","hard")
-DIR_VOCAB = ["utils","lib","jobs","steps","tasks","mods","bin","pipes","scripts"]
-VERBS = ["prep","load","filter","merge","archive","rotate","sync","ship","stage","ingest"]
-ECHOES = ["ok","done","ready","processed","success","step-complete","hello","ping","work"]
-NOISE_DIR_VOCAB = ["examples","demo","legacy","samples","tmp","tools","experiments","play","misc","contrib","vendor","third_party"]
-NOISE_EXTS = [".sh",".cmd",".ps1",".py",".pl"]
-NOISE_ECHOS = ["noop","noise","sample","example","unused","placeholder","debug"]
+DIR_VOCAB = ("utils","lib","jobs","steps","tasks","mods","bin","pipes","scripts")
+VERBS = ("prep","load","filter","merge","archive","rotate","sync","ship","stage","ingest")
+ECHOES = ("ok","done","ready","processed","success","step-complete","hello","ping","work")
+NOISE_DIR_VOCAB = ("examples","demo","legacy","samples","tmp","tools","experiments","play","misc","contrib","vendor","third_party")
+NOISE_EXTS = (".sh",".cmd",".ps1",".py",".pl")
+NOISE_ECHOS = ("noop","noise","sample","example","unused","placeholder","debug")
 
 def _write_noise_file(p: Path, rnd: random.Random):
     ext = p.suffix.lower()
@@ -52,9 +53,43 @@ def canon(p: Path, root: Path, windows: bool):
     s = str(rel).replace("\\","/")
     return s.lower() if windows else s
 
+_NEWLINE = os.linesep   # what text-mode writes turn "\n" into
+_written: dict = {}     # files of the bundle being generated -> text as written
+
 def write(p: Path, content: str):
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(content, encoding="utf-8")
+    # stage a file of the current bundle; _flush() puts the bundle on disk
+    if _NEWLINE != "\n":
+        content = content.replace("\n", _NEWLINE)
+    _written[p] = content
+
+def _flush():
+    # encode once and write bytes (same bytes a text-mode write_text produced);
+    # only mkdir when the parent is actually missing
+    for p, content in _written.items():
+        data = content.encode("utf-8")
+        try:
+            f = open(p, "wb")
+        except FileNotFoundError:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            f = open(p, "wb")
+        with f:
+            f.write(data)
+    _written.clear()
+
+def _clear_dir(path):
+    # remove everything below path, bottom-up; DirEntry types come from readdir, no extra stat
+    with os.scandir(path) as it:
+        entries = list(it)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            _clear_dir(entry.path)
+            os.rmdir(entry.path)
+        else:
+            os.unlink(entry.path)
+
+def _read_back(text: str) -> str:
+    # what read_text() returns for a written file (universal newlines)
+    return text.replace("\r\n", "\n").replace("\r", "\n")
 
 def salted(rnd: random.Random, base: str) -> str:
     # deterministic short salt for visible variation
@@ -96,10 +131,11 @@ def mk_shell_dispatch(root: Path, windows: bool, rnd: random.Random):
     write(a, f"#!/usr/bin/env bash\n# {salted(rnd,'a')}\necho \"{rnd.choice(ECHOES)}\"\n")
     write(b, f"#!/usr/bin/env bash\n# {salted(rnd,'b')}\necho \"{rnd.choice(ECHOES)}\"\n")
     write(run, f"#!/usr/bin/env bash\n# {salted(rnd,'run')}\n./{dirn}/{verbs[0]}.sh\n./{dirn}/{verbs[1]}.sh\n")
-    nodes = {canon(p,root,windows) for p in [run,a,b]}
+    src = canon(run,root,windows); dst_a = canon(a,root,windows); dst_b = canon(b,root,windows)
+    nodes = {src, dst_a, dst_b}
     edges = [
-        {"src": canon(run,root,windows), "dst": canon(a,root,windows), "kind":"call","dge":f'./{dirn}/{verbs[0]}.sh'},
-        {"src": canon(run,root,windows), "dst": canon(b,root,windows), "kind":"call","dge":f'./{dirn}/{verbs[1]}.sh'},
+        {"src": src, "dst": dst_a, "kind":"call","dge":f'./{dirn}/{verbs[0]}.sh'},
+        {"src": src, "dst": dst_b, "kind":"call","dge":f'./{dirn}/{verbs[1]}.sh'},
     ]
     feats = {"fan-out","direct-call"}
     return nodes, edges, [run], feats
@@ -115,7 +151,7 @@ def mk_shell_varind(root: Path, windows: bool, rnd: random.Random):
 BASE="./{dirn}"
 NAME="{v}.sh"
 TARGET="$BASE/$NAME"
-{rnd.choice(['bash','$TARGET','$TARGET'])} "$TARGET"
+{rnd.choice(('bash','$TARGET','$TARGET'))} "$TARGET"
 """
     # normalize the verb used in dge
     verb = "bash"
@@ -135,7 +171,7 @@ def mk_ps_dotsource(root: Path, windows: bool, rnd: random.Random):
  
 def mk_cmd_varind(root: Path, windows: bool, rnd: random.Random):
     run = root/"Run.cmd"
-    dirn = rnd.choice(["bin","steps","tasks"])
+    dirn = rnd.choice(("bin","steps","tasks"))
     step = rnd.choice(VERBS)
     sub = root/dirn/f"{step}.cmd"
     write(sub, "@echo off\r\necho "+rnd.choice(ECHOES)+"\r\n")
@@ -160,7 +196,7 @@ def mk_shell_varcall(root: Path, windows: bool, rnd: random.Random):
 BASE="./{dirn}"
 NAME="{v}.sh"
 TARGET="$BASE/$NAME"
-"$TARGET" "$TARGET"
+"$TARGET"
 """
     write(run, body)
     src = canon(run,root,windows); dst = canon(tgt,root,windows)
@@ -253,7 +289,7 @@ perl "./scripts/w.pl"
 def mk_cmd_for_loop(root: Path, windows: bool, rnd: random.Random):
     # FOR loop with delayed expansion and CALL through var
     run = root/"Run.cmd"
-    dirn = rnd.choice(["bin","steps","tasks"])
+    dirn = rnd.choice(("bin","steps","tasks"))
     sub = root/dirn/"step.cmd"
     write(sub, "@echo off\r\necho "+rnd.choice(ECHOES)+"\r\n")
     body = (
@@ -285,7 +321,7 @@ def mk_ps_var_dotsource(root: Path, windows: bool, rnd: random.Random):
 def mk_cmd_chain_vars(root: Path, windows: bool, rnd: random.Random):
     # Chain of env vars with delayed expansion, final CALL through !TARGET!
     run = root / "Run.cmd"
-    dirn = rnd.choice(["bin", "steps", "tasks"])
+    dirn = rnd.choice(("bin", "steps", "tasks"))
     sub  = root / dirn / "step.cmd"
     write(sub, "@echo off\r\necho " + rnd.choice(ECHOES) + "\r\n")
     body = (
@@ -326,7 +362,7 @@ def mk_shell_multi_chain(root: Path, windows: bool, rnd: random.Random):
     run = root / "run.sh"
     env = root / "etc" / "env.sh"
     dirn = rnd.choice(DIR_VOCAB)
-    sub  = rnd.choice(["steps","tasks","bin"])
+    sub  = rnd.choice(("steps","tasks","bin"))
     v    = rnd.choice(VERBS)
     target = root / dirn / sub / f"{v}.sh"
 
@@ -344,11 +380,12 @@ bash "$TARGET"
     src = canon(run, root, windows); dst = canon(target, root, windows)
     feats = {"dot-sourcing","var-indirection","interpreter-hop-bash","multi-hop"}
     # include the dot-source dependency in ground truth
+    env_n = canon(env, root, windows)
     edges = [
-        {"src": src, "dst": canon(env, root, windows), "kind": "source", "dge": ". ./etc/env.sh"},
+        {"src": src, "dst": env_n, "kind": "source", "dge": ". ./etc/env.sh"},
         {"src": src, "dst": dst, "kind": "call",   "dge": 'bash "$TARGET"'},
     ]
-    return {src, dst, canon(env, root, windows)}, edges, [run], feats
+    return {src, dst, env_n}, edges, [run], feats
 
 
 def mk_cmd_multi_chain(root: Path, windows: bool, rnd: random.Random):
@@ -361,8 +398,8 @@ def mk_cmd_multi_chain(root: Path, windows: bool, rnd: random.Random):
       call "!TARGET!"
     """
     run  = root / "Run.cmd"
-    d1   = rnd.choice(["steps","tasks","bin"])
-    d2   = rnd.choice(["core","work","sub"])
+    d1   = rnd.choice(("steps","tasks","bin"))
+    d2   = rnd.choice(("core","work","sub"))
     sub  = root / d1 / d2 / "step.cmd"
     write(sub, "@echo off\r\necho " + rnd.choice(ECHOES) + "\r\n")
 
@@ -389,7 +426,7 @@ def mk_ps_multi_chain(root: Path, windows: bool, rnd: random.Random):
     run  = root / "Run.ps1"
     env  = root / "Env.ps1"
     dirn = rnd.choice(DIR_VOCAB)
-    sub  = rnd.choice(["steps","tasks","bin"])
+    sub  = rnd.choice(("steps","tasks","bin"))
     v    = rnd.choice(VERBS)
     tgt  = root / dirn / sub / f"{v}.ps1"
 
@@ -409,11 +446,16 @@ def mk_ps_multi_chain(root: Path, windows: bool, rnd: random.Random):
     src = canon(run, root, windows); dst = canon(tgt, root, windows)
     feats = {"dot-sourcing","var-indirection","multi-hop"}
     # include the dot-source dependency in ground truth
+    env_n = canon(env, root, windows)
     edges = [
-        {"src": src, "dst": canon(env, root, windows), "kind": "source", "dge": dge_ps_source("./Env.ps1")},
+        {"src": src, "dst": env_n, "kind": "source", "dge": dge_ps_source("./Env.ps1")},
         {"src": src, "dst": dst, "kind": "call", "dge": "& $Full"},
     ]
-    return {src, dst, canon(env, root, windows)}, edges, [run], feats
+    return {src, dst, env_n}, edges, [run], feats
+
+# a hard bundle needs at least one of these
+_DYNAMIC_FEATURES = frozenset({"var-indirection","delayed-expansion","dot-sourcing","interpreter-hop-bash",
+                               "interpreter-hop-python","interpreter-hop-perl","for-loop","cross-language"})
 
 def mk_bundle(root: Path, hard: bool, platform: str, rnd: random.Random, seen_hashes: set, min_hard_features: int):
     windows = platform in ("windows","mixed") and (platform=="windows" or rnd.random()<0.5)
@@ -442,20 +484,15 @@ def mk_bundle(root: Path, hard: bool, platform: str, rnd: random.Random, seen_ha
 
     # generate, then ensure textual uniqueness via salt if needed
     attempts = 0
+    _written.clear()
     while True:
         nodes, edges, seeds, feats = maker(root, windows, rnd)
         # enforce difficulty for hard bundles: at least N features and at least one dynamic feature
         if hard:
-            dynamic = {"var-indirection","delayed-expansion","dot-sourcing","interpreter-hop-bash",
-                       "interpreter-hop-python","interpreter-hop-perl","for-loop","cross-language"}
-            if len(feats & dynamic) < 1 or len(feats) < min_hard_features:
+            if feats.isdisjoint(_DYNAMIC_FEATURES) or len(feats) < min_hard_features:
                 maker = rnd.choice(makers_hard)  # try another pattern
-                # clean any files created so far
-                for p in sorted(root.rglob("*"), reverse=True):
-                    if p.is_file(): p.unlink()
-                    elif p.is_dir(): 
-                        try: p.rmdir()
-                        except OSError: pass
+                # drop the staged files (nothing has touched the disk yet)
+                _written.clear()
                 attempts += 1
                 if attempts > 6:
                     # fall through with whatever we have after several tries
@@ -474,21 +511,17 @@ def mk_bundle(root: Path, hard: bool, platform: str, rnd: random.Random, seen_ha
             if inject:
                 add_noise(root, rnd, dirs=noise_dirs, files_per_dir=noise_files)
 
-        # fingerprint all file contents
-        buf = []
-        for p in sorted(root.rglob("*")):
-            if p.is_file():
-                buf.append(p.read_text(encoding="utf-8", errors="ignore"))
-        h = hashlib.sha256(("||".join(buf)).encode("utf-8")).hexdigest()
+        # fingerprint all file contents, from memory rather than re-reading the tree
+        buf = [_read_back(_written[p]) for p in sorted(_written)]
+        # dedup key only, no cryptographic need: 128-bit blake2b is plenty here
+        h = hashlib.blake2b(("||".join(buf)).encode("utf-8"), digest_size=16).hexdigest()
         if h not in seen_hashes: 
             seen_hashes.add(h)
             break
         # collide: append a tiny salt comment to run file and try again
         attempts += 1
-        run_candidates = [s for s in seeds if s.exists()]
-        if run_candidates:
-            rp = run_candidates[0]
-            rp.write_text(rp.read_text(encoding="utf-8") + f"\n# uniq-{attempts}-{rnd.randrange(10**6)}\n", encoding="utf-8")
+        rp = seeds[0]   # every maker writes its single run script
+        write(rp, _read_back(_written[rp]) + f"\n# uniq-{attempts}-{rnd.randrange(10**6)}\n")
         if attempts > 3:  # give up after a few tries
             break
 
@@ -496,37 +529,55 @@ def mk_bundle(root: Path, hard: bool, platform: str, rnd: random.Random, seen_ha
     (root).mkdir(parents=True, exist_ok=True)
     write(root/"seeds.txt", "\n".join([p.name for p in seeds]) + "\n")
     truth = {"nodes": sorted(nodes), "edges": edges}
-    write(
-        root / "truth.yaml",
-        textwrap.dedent(
-            "nodes:\n"
-            + "".join([f"  - {json.dumps(n)}\n" for n in truth["nodes"]])
-            + "edges:\n"
-            + "".join(
-                [
-                    "  - src: {src}\n"
-                    "    dst: {dst}\n"
-                    "    kind: {kind}\n"
-                    "    dge: {dge}\n".format(
-                        src=json.dumps(e["src"]),
-                        dst=json.dumps(e["dst"]),
-                        kind=json.dumps(e["kind"]),
-                        dge=json.dumps(e["dge"]),
-                    )
-                    for e in truth["edges"]
-                ]
-            )
-        ),
-    )
-    meta = {
-        "platform": "windows" if windows else "linux",
-        "hard": hard,
-        "pattern": maker.__name__,
-        "features": sorted(list(feats))
-    }
-    write(root/"meta.json", json.dumps(meta, indent=2))
+    # every line starts at column 0 or a fixed indent, so no dedent is needed
+    parts = ["nodes:\n"]
+    parts.extend(f"  - {json.dumps(n)}\n" for n in truth["nodes"])
+    parts.append("edges:\n")
+    for e in truth["edges"]:
+        parts.append(
+            f"  - src: {json.dumps(e['src'])}\n"
+            f"    dst: {json.dumps(e['dst'])}\n"
+            f"    kind: {json.dumps(e['kind'])}\n"
+            f"    dge: {json.dumps(e['dge'])}\n"
+        )
+    write(root / "truth.yaml", "".join(parts))
+    # fixed schema, laid out exactly as json.dumps(meta, indent=2) would
+    platform_name = "windows" if windows else "linux"
+    features = ",\n    ".join(json.dumps(f) for f in sorted(feats))
+    features = "[\n    " + features + "\n  ]" if features else "[]"
+    write(root/"meta.json",
+          "{\n"
+          f'  "platform": "{platform_name}",\n'
+          f'  "hard": {"true" if hard else "false"},\n'
+          f'  "pattern": {json.dumps(maker.__name__)},\n'
+          f'  "features": {features}\n'
+          "}")
+    _flush()
     return nodes, edges, seeds
 
+def _bundle_rng(master: int, i: int) -> random.Random:
+    # independent, reproducible stream per bundle index (no dependence on generation order)
+    # any int seed (as random.Random accepts): reduced to 64 bits, same bytes as before for
+    # seeds in the signed 64-bit range
+    seed = (master & 0xFFFF_FFFF_FFFF_FFFF).to_bytes(8, "big")
+    h = hashlib.blake2b(seed + i.to_bytes(4, "big"), digest_size=8).digest()
+    return random.Random(int.from_bytes(h, "big"))
+
+def _init_worker(noise_dirs: int, noise_files: int, noise_scope: str):
+    # worker processes don't run main(), so expose the noise settings for mk_bundle here
+    global _noise_dirs, _noise_files, _noise_scope
+    _noise_dirs, _noise_files, _noise_scope = noise_dirs, noise_files, noise_scope
+
+def _gen_bundle(job):
+    # generate one bundle without knowledge of the others; returns its fingerprint
+    root, hard, platform, seed, i, min_hard_features = job
+    if root.exists():
+        _clear_dir(root)
+    seen = set()
+    mk_bundle(root, hard=hard, platform=platform, rnd=_bundle_rng(seed, i), seen_hashes=seen,
+              min_hard_features=min_hard_features)
+    return next(iter(seen))
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--out", default="data/bundles")
@@ -539,6 +590,11 @@ def main():
     ap.add_argument("--noise-dirs",  type=int, default=0, help="number of decoy subdirectories per bundle")
     ap.add_argument("--noise-files", type=int, default=0, help="number of decoy scripts per decoy directory")
     ap.add_argument("--noise-scope", choices=["none","hard","easy","all"], default="hard", help="which bundle kinds receive decoy noise")
+    ap.add_argument("--per-bundle-rng", action="store_true",
+                    help="seed each bundle independently from --seed and its index instead of one shared stream")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="worker processes; >1 implies --per-bundle-rng "
+                         "(same output as --per-bundle-rng for any --jobs value)")
     args = ap.parse_args()
 
     # expose for mk_bundle
@@ -547,17 +603,37 @@ def main():
     _noise_files = int(args.noise_files)
     _noise_scope = str(args.noise_scope)
 
-    rnd = random.Random(args.seed)
     base = Path(args.out)/args.kind
+    hard = args.kind == "hard"
+    if args.jobs > 1:
+        jobs = [(base / f"{i:03d}", hard, args.platform, args.seed, i, args.min_hard_features)
+                for i in range(1, args.count+1)]
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                 initargs=(_noise_dirs, _noise_files, _noise_scope)) as ex:
+            hashes = list(ex.map(_gen_bundle, jobs, chunksize=max(1, len(jobs) // (args.jobs * 4))))
+        # dedup after the fact, in index order: a bundle whose content matches an earlier one
+        # is regenerated here against everything seen so far, as a serial run would have done
+        seen = set()
+        for (root, _, _, _, i, _), h in zip(jobs, hashes):
+            if h not in seen:
+                seen.add(h)
+                continue
+            _clear_dir(root)
+            mk_bundle(root, hard=hard, platform=args.platform, rnd=_bundle_rng(args.seed, i), seen_hashes=seen,
+                      min_hard_features=args.min_hard_features)
+        print(f"wrote {args.count} {args.kind} bundles under {base}")
+        return
+
+    rnd = random.Random(args.seed)
     seen = set()
     for i in range(1, args.count+1):
         root = base/ f"{i:03d}"
         if root.exists():
             # clean existing to avoid stale files influencing hashes
-            for p in sorted(root.rglob("*"), reverse=True):
-                if p.is_file(): p.unlink()
-                else: p.rmdir()
-        mk_bundle(root, hard=(args.kind=="hard"), platform=args.platform, rnd=rnd, seen_hashes=seen,
+            _clear_dir(root)
+        if args.per_bundle_rng:
+            rnd = _bundle_rng(args.seed, i)
+        mk_bundle(root, hard=hard, platform=args.platform, rnd=rnd, seen_hashes=seen,
                   min_hard_features=args.min_hard_features)
     print(f"wrote {args.count} {args.kind} bundles under {base}")
 